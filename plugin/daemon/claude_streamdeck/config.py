@@ -19,8 +19,39 @@ class DaemonConfig:
         default_factory=lambda: _expand("~/.config/claude-streamdeck/assets")
     )
     max_asset_bytes: int = 5 * 1024 * 1024
+    # Worker processes preparing large animated assets; 0 keeps it in-process.
+    prepare_workers: int = 0
+    # Threads resizing/encoding asset cache misses off the event loop.
+    resize_workers: int = 2
+    # Decoded frames kept per animated asset; the rest are decoded on demand.
+    frame_window: int = 8
+    # Memory budget for resized and encoded frames across all assets.
+    cache_bytes: int = 64 * 1024 * 1024
+    # Persistent encoded frames; 0 bytes disables the disk cache.
+    cache_dir: Path = field(
+        default_factory=lambda: _expand("~/.config/claude-streamdeck/cache")
+    )
+    disk_cache_bytes: int = 256 * 1024 * 1024
+    disk_cache_max_age_days: float = 30.0
+    # Static assets are indexed at startup and loaded on first use; when set,
+    # they're also loaded in the background once the socket is up.
+    warm_static_assets: bool = True
+    # Reload changed files in assets_dir (inotify, or polling at this interval).
+    watch_assets: bool = True
+    watch_poll_interval_s: float = 2.0
+    # Lines queued per client before slow_consumer_policy applies:
+    # "drop_oldest", "coalesce" or "disconnect".
+    outbound_queue: int = 256
+    slow_consumer_policy: str = "drop_oldest"
+    # Protocol JSON decoder: "auto" (orjson if installed), "orjson" or "json".
+    json_codec: str = "auto"
     extensions: list[dict[str, Any]] = field(default_factory=list)
 
+    @property
+    def max_line_bytes(self) -> int:
+        """Largest protocol line: a base64 `max_asset_bytes` upload plus headroom."""
+        return -(-self.max_asset_bytes // 3) * 4 + 64 * 1024
+
 
 def load_config(path: Optional[Path]) -> DaemonConfig:
     if path is None or not path.exists():
@@ -34,6 +65,19 @@ def load_config(path: Optional[Path]) -> DaemonConfig:
         assets_dir=_expand(daemon.get("assets_dir",
                                       "~/.config/claude-streamdeck/assets")),
         max_asset_bytes=int(daemon.get("max_asset_bytes", 5 * 1024 * 1024)),
+        prepare_workers=int(daemon.get("prepare_workers", 0)),
+        resize_workers=int(daemon.get("resize_workers", 2)),
+        frame_window=int(daemon.get("frame_window", 8)),
+        cache_bytes=int(daemon.get("cache_bytes", 64 * 1024 * 1024)),
+        cache_dir=_expand(daemon.get("cache_dir", "~/.config/claude-streamdeck/cache")),
+        disk_cache_bytes=int(daemon.get("disk_cache_bytes", 256 * 1024 * 1024)),
+        disk_cache_max_age_days=float(daemon.get("disk_cache_max_age_days", 30.0)),
+        warm_static_assets=bool(daemon.get("warm_static_assets", True)),
+        watch_assets=bool(daemon.get("watch_assets", True)),
+        watch_poll_interval_s=float(daemon.get("watch_poll_interval_s", 2.0)),
+        outbound_queue=int(daemon.get("outbound_queue", 256)),
+        slow_consumer_policy=str(daemon.get("slow_consumer_policy", "drop_oldest")),
+        json_codec=str(daemon.get("json_codec", "auto")),
         extensions=list(raw.get("extensions", []) or []),
     )
     return cfg
@@ -0,0 +1,179 @@
+"""Single timer-heap scheduler that drives every animation on every device."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from .device import Device
+
+logger = logging.getLogger(__name__)
+
+# Deadlines this close together are treated as the same instant and served
+# by a single wakeup.
+_COALESCE_S = 0.002
+
+
+# One animation frame: an encoded image per animated button, and its duration.
+Frame = tuple[tuple[bytes, ...], int]
+
+
+@dataclass(eq=False)
+class Animation:
+    """A frame sequence playing on one or more buttons of a device.
+
+    All `buttons` advance together on the same tick; each frame holds one
+    encoded image per button, in the same order.
+
+    `index` is the frame currently shown; `deadline` is the loop time at
+    which the next frame is due. Deadlines are advanced by the frame
+    duration from the previous deadline, never from "now", so write
+    latency doesn't accumulate into drift. When the scheduler falls behind,
+    frames whose display window has already passed are skipped.
+
+    While `complete` is False the sequence is still being prepared and may
+    grow: looping animations cycle through the frames ready so far, and
+    one-shot ones hold their current frame until the next one arrives.
+    """
+    device: Device
+    buttons: tuple[int, ...]
+    sequence: list[Frame]
+    loop: bool
+    index: int = 0
+    deadline: float = 0.0
+    cancelled: bool = False
+    complete: bool = True
+
+
+class AnimationScheduler:
+    """Heap of animations keyed by monotonic deadline, armed with one timer.
+
+    A frame counts as dropped when its whole display window elapsed before
+    it could be issued, or when it supersedes a previous frame the device
+    hasn't written yet. Drops are tallied per (device_id, button).
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, Animation]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at: Optional[float] = None
+        self.wakeups = 0
+        self.dropped: Counter[tuple[str, int]] = Counter()
+
+    def add(self, anim: Animation) -> None:
+        """Show the first frame now and schedule the rest."""
+        loop = asyncio.get_running_loop()
+        anim.index = 0
+        anim.deadline = loop.time()
+        if self._show(anim):
+            self._push(anim)
+        self._arm(loop)
+
+    def cancel(self, anim: Animation) -> None:
+        # Lazy removal: the heap entry is discarded when it comes due.
+        anim.cancelled = True
+
+    def close(self) -> None:
+        for _, _, anim in self._heap:
+            anim.cancelled = True
+        self._heap.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = self._timer_at = None
+
+    def _push(self, anim: Animation) -> None:
+        heapq.heappush(self._heap, (anim.deadline, next(self._seq), anim))
+
+    def _show(self, anim: Animation) -> bool:
+        """Write the current frame and advance the deadline. False if finished."""
+        images, dur = anim.sequence[anim.index]
+        try:
+            if len(anim.buttons) == 1:
+                anim.device.set_key_native(anim.buttons[0], images[0])
+            else:
+                anim.device.set_keys_native(dict(zip(anim.buttons, images)))
+        except Exception:
+            logger.exception("animation write failed on %s/%s",
+                             anim.device.id, anim.buttons)
+            anim.cancelled = True
+            return False
+        anim.deadline += dur / 1000.0
+        return True
+
+    def _step(self, anim: Animation, now: float) -> bool:
+        seq = anim.sequence
+        skipped = 0
+        if anim.loop:
+            period = sum(dur for _, dur in seq) / 1000.0
+            behind = now - anim.deadline
+            if period > 0 and behind >= period:
+                # Whole cycles behind: jump over them arithmetically.
+                cycles = int(behind // period)
+                anim.deadline += cycles * period
+                skipped += cycles * len(seq)
+        for steps in range(1, len(seq) + 1):
+            if not anim.complete and not anim.loop and anim.index + 1 >= len(seq):
+                # Next frame still being prepared: hold and check again later.
+                anim.deadline += seq[anim.index][1] / 1000.0
+                self._count_drops(anim, skipped)
+                return True
+            anim.index += 1
+            if anim.index >= len(seq):
+                if not anim.loop:
+                    anim.cancelled = True
+                    self._count_drops(anim, skipped)
+                    return False
+                anim.index = 0
+            end = anim.deadline + seq[anim.index][1] / 1000.0
+            last = not anim.loop and anim.complete and anim.index == len(seq) - 1
+            if end > now or last or steps == len(seq):
+                break
+            # This frame's window is already over; skip to stay on schedule.
+            anim.deadline = end
+            skipped += 1
+        self._count_drops(anim, skipped, superseding=True)
+        return self._show(anim)
+
+    def _count_drops(self, anim: Animation, n: int, superseding: bool = False) -> None:
+        for button in anim.buttons:
+            lost = n
+            if superseding and anim.device.key_write_pending(button):
+                lost += 1  # the queued frame is about to be replaced unwritten
+            if lost:
+                self.dropped[(anim.device.id, button)] += lost
+
+    def _arm(self, loop: asyncio.AbstractEventLoop) -> None:
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = self._timer_at = None
+            return
+        when = self._heap[0][0]
+        if self._timer is not None:
+            if self._timer_at == when:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._run_due)
+        self._timer_at = when
+
+    def _run_due(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._timer = self._timer_at = None
+        self.wakeups += 1
+        now = loop.time()
+        horizon = now + _COALESCE_S
+        due: list[Animation] = []
+        while self._heap and self._heap[0][0] <= horizon:
+            _, _, anim = heapq.heappop(self._heap)
+            if not anim.cancelled:
+                due.append(anim)
+        for anim in due:
+            if self._step(anim, now):
+                self._push(anim)
+        self._arm(loop)
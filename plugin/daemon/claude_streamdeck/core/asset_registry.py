@@ -1,21 +1,41 @@
-"""Asset storage with static-dir loading, dynamic uploads, and resize cache."""
+"""Asset storage with static-dir loading, dynamic uploads, and resize/native caches."""
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import hashlib
 import io
+import itertools
 import logging
-from dataclasses import dataclass
+import os
+import stat
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Callable, Hashable, Optional
 
 from PIL import Image, UnidentifiedImageError
 
+from .device import Device
+from .disk_cache import DiskCache
+from .frame_cache import FrameCache
+from .frame_pool import FramePool
+
+try:  # Optional: vectorized tile slicing.
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None
+
 logger = logging.getLogger(__name__)
 
 
 class AssetNotFoundError(Exception):
-    pass
+    error_code = "asset_not_found"
 
 
 class AssetTooLargeError(Exception):
@@ -26,72 +46,495 @@ class InvalidAssetDataError(Exception):
     pass
 
 
-@dataclass
+class PackedFrame:
+    """A decoded frame held compactly until it's needed for resizing.
+
+    Frames with at most 256 distinct colours (icons, most GIFs) are stored
+    palette-indexed at one byte per pixel; anything richer is kept as
+    zlib-compressed RGB. Both are lossless: `expand()` returns exactly the
+    RGB pixels that were packed.
+    """
+    __slots__ = ("size", "palette", "data")
+
+    def __init__(self, image: Image.Image) -> None:
+        rgb = image.convert("RGB")
+        self.size = rgb.size
+        self.palette: Optional[bytes] = None
+        pixels = rgb.tobytes()
+        colors = rgb.getcolors(256)
+        if colors is not None:
+            pal = Image.new("P", (1, 1))
+            pal.putpalette([v for _, color in colors for v in color])
+            indexed = rgb.quantize(palette=pal, dither=Image.Dither.NONE)
+            # Pillow's palette lookup is approximate for near-identical
+            # colours; only keep the indexed form if it round-trips exactly.
+            if indexed.convert("RGB").tobytes() == pixels:
+                self.palette = bytes(indexed.getpalette()[:3 * len(colors)])
+                self.data = indexed.tobytes()
+                return
+        self.data = zlib.compress(pixels, 1)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) + len(self.palette or b"")
+
+    def expand(self) -> Image.Image:
+        if self.palette is None:
+            return Image.frombytes("RGB", self.size, zlib.decompress(self.data))
+        indexed = Image.frombytes("P", self.size, self.data)
+        indexed.putpalette(self.palette)
+        return indexed.convert("RGB")
+
+
+@dataclass(eq=False, slots=True)
+class AssetData:
+    """The pixels behind one or more asset names, keyed by `digest`.
+
+    Only the compressed `source` and the per-frame durations are kept for
+    the payload's lifetime. Frames are decoded on demand by `frame()`, and
+    the most recently used `window` of them stay cached as `PackedFrame`s, so
+    memory for long animations scales with the window rather than the frame
+    count, and a palette icon costs a byte per pixel rather than three.
+    `refs` counts the names bound to it. Between sequential frames of an
+    animation the open decoder (and the frame it holds) is kept, and
+    counted in `resident_bytes`; it's closed after a still image or the
+    last frame is decoded.
+    """
+    digest: str
+    source: bytes = field(repr=False)
+    frame_durations_ms: list[int]
+    window: int = 8
+    refs: int = 0
+    _frames: OrderedDict[int, PackedFrame] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+    _decoder: Optional[Image.Image] = field(default=None, init=False, repr=False)
+    # Frames are decoded from resize worker threads; seeking isn't re-entrant.
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frame_durations_ms)
+
+    @property
+    def resident_bytes(self) -> int:
+        """Bytes held by this payload: source, packed frame window and decoder."""
+        with self._lock:
+            held = len(self.source) + sum(f.nbytes for f in self._frames.values())
+            if self._decoder is not None:
+                held += self._decoder.width * self._decoder.height * len(
+                    self._decoder.getbands()
+                )
+            return held
+
+    def frame(self, index: int) -> Image.Image:
+        """Frame `index`, expanded to RGB."""
+        with self._lock:
+            packed = self._frames.get(index)
+            if packed is not None:
+                self._frames.move_to_end(index)
+            else:
+                if self._decoder is None:
+                    self._decoder = Image.open(io.BytesIO(self.source))
+                # Sequential access (the common case) only decodes forward;
+                # PIL rewinds on its own for earlier frames.
+                self._decoder.seek(index)
+                packed = PackedFrame(self._decoder)
+                if index >= self.frame_count - 1:
+                    # Nothing follows (a still, or the loop wraps and
+                    # rewinds anyway): don't keep the decoded frame around.
+                    self._decoder.close()
+                    self._decoder = None
+                self._frames[index] = packed
+                while len(self._frames) > max(1, self.window):
+                    self._frames.popitem(last=False)
+        return packed.expand()
+
+
+@dataclass(eq=False, slots=True)
 class Asset:
-    """A loaded asset, either single-frame or animated."""
+    """A loaded asset, either single-frame or animated: a name bound to data.
+
+    Names uploaded with identical bytes share one `AssetData`, and with it
+    the decoded frames and every cached resized or encoded variant.
+    """
     name: str
-    frames: list[Image.Image]
-    frame_durations_ms: list[int]
-    size_bytes: int
+    data: AssetData = field(repr=False)
+    # Bumped on every (re)load; (name, generation) identifies the pixels.
+    generation: int = 0
+    # File in the static dir this was loaded from; None for uploads.
+    path: Optional[Path] = None
+
+    @property
+    def digest(self) -> str:
+        return self.data.digest
+
+    @property
+    def source(self) -> bytes:
+        return self.data.source
+
+    @property
+    def frame_durations_ms(self) -> list[int]:
+        return self.data.frame_durations_ms
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.data.source)
 
     @property
     def animated(self) -> bool:
-        return len(self.frames) > 1
+        return self.frame_count > 1
 
     @property
     def frame_count(self) -> int:
-        return len(self.frames)
+        return self.data.frame_count
+
+    def frame(self, index: int) -> Image.Image:
+        return self.data.frame(index)
+
+
+@dataclass(frozen=True)
+class StaticEntry:
+    """A file in the static assets dir, indexed but not read yet."""
+    path: Path
+    size_bytes: int
+    mtime: float
+
+
+_STATIC_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif")
+
+
+def _slice_tiles(
+    image: Image.Image, layout: tuple[int, int], key_size: tuple[int, int]
+) -> list[Image.Image]:
+    """Cut a (cols*w, rows*h) image into row-major key tiles."""
+    rows, cols = layout
+    w, h = key_size
+    if np is not None:
+        # One reshape over the whole pixel array instead of rows*cols crops.
+        arr = np.asarray(image.convert("RGB"))
+        tiles = arr.reshape(rows, h, cols, w, 3).swapaxes(1, 2).reshape(-1, h, w, 3)
+        return [Image.fromarray(t) for t in tiles]
+    return [
+        image.crop((c * w, r * h, (c + 1) * w, (r + 1) * h))
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+def _resize_frame(data: AssetData, index: int, size: tuple[int, int]) -> Image.Image:
+    return data.frame(index).resize(size, Image.Resampling.LANCZOS)
+
+
+def _tile_frame(
+    data: AssetData, index: int, layout: tuple[int, int], key_size: tuple[int, int]
+) -> list[Image.Image]:
+    rows, cols = layout
+    full = _resize_frame(data, index, (cols * key_size[0], rows * key_size[1]))
+    return _slice_tiles(full, layout, key_size)
+
+
+def _native_tiles_key(asset: Asset, device: Device, index: int) -> tuple:
+    return (asset.digest, "native_tiles", device.key_layout, device.image_size,
+            device.encoder_settings(), index)
+
+
+def _native_key(asset: Asset, device: Device, index: int) -> tuple:
+    return (asset.digest, "native", device.image_size, device.encoder_settings(), index)
+
+
+def _disk_key(asset: Asset, device: Device, index: int) -> str:
+    return DiskCache.frame_key(
+        asset.digest, device.image_size, device.encoder_settings(), index
+    )
+
+
+# Animated assets with at least this many frames go to the process pool.
+_POOL_MIN_FRAMES = 16
 
 
 class AssetRegistry:
-    """Stores assets by name; provides resized variants from a cache."""
+    """Stores assets by name; provides resized and device-encoded variants from caches.
+
+    Names are bound to reference-counted `AssetData` interned by the sha256
+    of its bytes. Every cache entry is keyed by that digest, never by name,
+    so identical uploads under different names are decoded, resized and
+    encoded once, and a payload's entries are freed when the last name bound
+    to it is replaced or removed.
+
+    Three tiers sit on top of the decoded frames, all keyed
+    `(digest, tier, ...)`: resized PIL images per (size, frame),
+    device-native bytes per (size, encoder settings, frame), and full-deck
+    images sliced into per-key tiles and encoded per (key layout, key size,
+    encoder settings, frame). The native tiers let animations push the same
+    frame repeatedly without re-encoding it on every tick. All tiers share
+    one byte-budgeted LRU (`cache_bytes`); encoded frames are also kept in
+    the optional `DiskCache` across restarts.
+
+    The `*_async` getters run cache misses on a bounded thread pool (Pillow
+    releases the GIL while resizing and encoding) and share one in-flight
+    future between concurrent requests for the same entry. With
+    `prepare_workers` > 0, large animations are resized and encoded across
+    a process pool instead.
+    """
 
     def __init__(
         self,
         static_dir: Optional[Path],
         max_size_bytes: int = 5 * 1024 * 1024,
+        prepare_workers: int = 0,
+        resize_workers: int = 2,
+        frame_window: int = 8,
+        cache_bytes: int = 64 * 1024 * 1024,
+        disk_cache: Optional[DiskCache] = None,
     ) -> None:
         self._assets: dict[str, Asset] = {}
-        self._resize_cache: dict[tuple[str, tuple[int, int], int], Image.Image] = {}
+        self._disk = disk_cache
+        # digest -> payload shared by every name uploaded with those bytes
+        self._payloads: dict[str, AssetData] = {}
+        # One budget across all tiers; keys are (digest, tier, ...):
+        #   (digest, "resized", size, frame)                  -> Image
+        #   (digest, "native", size, encoder settings, frame) -> bytes
+        #   (digest, "native_tiles", layout, key size, encoder settings, frame)
+        #                                                     -> tuple[bytes, ...]
+        self._cache = FrameCache(cache_bytes)
         self._max_size = max_size_bytes
+        self._generations = itertools.count(1)
+        self._frame_window = frame_window
+        self._pool = FramePool(prepare_workers) if prepare_workers > 0 else None
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, resize_workers), thread_name_prefix="asset-resize"
+        )
+        # cache key -> future computing it; keys start with the digest
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        # Disk cache writes still running; close() lets them finish.
+        self._writes: set[Future] = set()
+        self._writes_lock = threading.Lock()
+        # Static files indexed at startup and not loaded yet, by name.
+        self._static: dict[str, StaticEntry] = {}
         if static_dir is not None and static_dir.is_dir():
-            self._load_static(static_dir)
+            self._index_static(static_dir)
 
-    def _load_static(self, dir_path: Path) -> None:
-        for f in sorted(dir_path.iterdir()):
-            if not f.is_file():
-                continue
-            if f.suffix.lower() not in (".png", ".jpg", ".jpeg", ".gif"):
-                continue
+    def _index_static(self, dir_path: Path) -> None:
+        """Record the static files by name from directory metadata alone.
+
+        Files are read and indexed on first use (`get`) or by `warm_static`,
+        so startup cost doesn't grow with the size of the library.
+        """
+        with os.scandir(dir_path) as it:
+            for e in sorted(it, key=lambda e: e.name):
+                path = Path(e.path)
+                if path.suffix.lower() not in _STATIC_SUFFIXES or not e.is_file():
+                    continue
+                st = e.stat()
+                self._static[path.stem] = StaticEntry(path, st.st_size, st.st_mtime)
+        logger.info("Indexed %d static assets in %s", len(self._static), dir_path)
+
+    def _load_static(self, name: str, entry: StaticEntry) -> Asset:
+        try:
+            asset = self._build_asset(name, entry.path.read_bytes(), entry.path)
+        except Exception as e:
+            del self._static[name]
+            logger.exception("Failed to load static asset %s", entry.path)
+            raise AssetNotFoundError(name) from e
+        self._bind(asset)
+        logger.info("Loaded static asset: %s", name)
+        return asset
+
+    async def warm_static(self) -> None:
+        """Load every indexed static asset off the event loop, one at a time."""
+        loop = asyncio.get_running_loop()
+        for name, entry in list(self._static.items()):
+            if self._static.get(name) is not entry:
+                continue  # loaded or replaced since
             try:
-                data = f.read_bytes()
-                asset = self._build_asset(f.stem, data)
-                self._assets[asset.name] = asset
-                logger.info("Loaded static asset: %s", asset.name)
+                asset = await loop.run_in_executor(
+                    self._executor, self._read_static, name, entry
+                )
             except Exception:
-                logger.exception("Failed to load static asset %s", f)
+                logger.exception("Failed to load static asset %s", entry.path)
+                if self._static.get(name) is entry:
+                    del self._static[name]
+                continue
+            if self._static.get(name) is entry:
+                self._bind(asset)
+
+    def _read_static(self, name: str, entry: StaticEntry) -> Asset:
+        return self._build_asset(name, entry.path.read_bytes(), entry.path)
+
+    def reload_static(self, path: Path) -> bool:
+        """Pick up an added, changed or deleted file in the static dir.
+
+        Only that file is re-read, and only when its name is loaded; pending
+        names just get a fresh index entry. Names bound by upload or
+        `asset.ensure` take precedence over the file. Returns True if the
+        pixels behind a loaded name changed, i.e. its buttons need a repaint.
+        """
+        name = path.stem
+        current = self._assets.get(name)
+        if current is not None and current.path is None:
+            return False
+        try:
+            st = path.stat() if path.suffix.lower() in _STATIC_SUFFIXES else None
+        except FileNotFoundError:
+            st = None
+        if st is None:
+            pending = self._static.get(name)
+            if pending is not None and pending.path == path:
+                del self._static[name]
+            if current is not None and current.path == path:
+                self.remove(name)
+                logger.info("Static asset removed: %s", name)
+            return False
+        if current is None:
+            self._static[name] = StaticEntry(path, st.st_size, st.st_mtime)
+            return False
+        try:
+            asset = self._build_asset(name, path.read_bytes(), path)
+        except Exception:
+            logger.exception("Failed to reload static asset %s", path)
+            return False
+        if asset.digest == current.digest:
+            return False
+        self._bind(asset)
+        logger.info("Reloaded static asset: %s", name)
+        return True
 
     def upload(self, name: str, data_b64: str) -> Asset:
         try:
             raw = base64.b64decode(data_b64, validate=True)
         except Exception as e:
             raise InvalidAssetDataError(f"base64 decode failed: {e}") from e
+        return self.upload_bytes(name, raw)
+
+    def upload_file(self, name: str, path: Path) -> Asset:
+        """Upload the bytes of a local file, without any base64 round trip.
+
+        `path` may be a regular file, a POSIX shared memory object under
+        /dev/shm, or a client's memfd as /proc/<pid>/fd/<n>. The size is
+        checked against `max_size_bytes` before anything is read.
+        """
+        try:
+            with path.open("rb") as f:
+                st = os.fstat(f.fileno())
+                if not stat.S_ISREG(st.st_mode):
+                    raise InvalidAssetDataError(f"{path} is not a regular file")
+                if st.st_size > self._max_size:
+                    raise AssetTooLargeError(f"{st.st_size} > {self._max_size}")
+                if st.st_size == 0:
+                    raise InvalidAssetDataError(f"{path} is empty")
+                raw = f.read(st.st_size)
+        except OSError as e:
+            raise InvalidAssetDataError(f"cannot read {path}: {e}") from e
+        if len(raw) != st.st_size:
+            raise InvalidAssetDataError(f"{path} changed while it was read")
+        return self.upload_bytes(name, raw)
+
+    def upload_bytes(self, name: str, raw: bytes) -> Asset:
+        """Upload already-decoded image bytes."""
         if len(raw) > self._max_size:
             raise AssetTooLargeError(f"{len(raw)} > {self._max_size}")
         asset = self._build_asset(name, raw)
-        # Invalidate any previously cached resizes for this name.
-        self._invalidate_resize_cache(name)
-        self._assets[name] = asset
+        if self._disk is not None and asset.data.refs == 0:
+            self._persist(self._disk.put_source, asset.digest, raw)
+        self._bind(asset)
+        return asset
+
+    def bind(self, name: str, digest: str) -> Optional[Asset]:
+        """Bind `name` to content already held under `digest`.
+
+        Looks in memory first, then among sources persisted by earlier
+        uploads. Returns None when the content has to be uploaded.
+        """
+        current = self._assets.get(name)
+        if current is not None and current.digest == digest:
+            return current  # already bound; keep its identity
+        data = self._payloads.get(digest)
+        if data is not None:
+            asset = Asset(name=name, data=data, generation=next(self._generations))
+        else:
+            raw = self._disk.get_source(digest) if self._disk is not None else None
+            if raw is None or hashlib.sha256(raw).hexdigest() != digest:
+                return None
+            asset = self._build_asset(name, raw)
+        self._bind(asset)
         return asset
 
-    def _build_asset(self, name: str, raw: bytes) -> Asset:
+    def _bind(self, asset: Asset) -> None:
+        """Point `asset.name` at `asset`, releasing whatever it pointed at."""
+        # Payloads built off the loop may duplicate one interned meanwhile.
+        data = asset.data = self._payloads.setdefault(asset.digest, asset.data)
+        data.refs += 1
+        self._static.pop(asset.name, None)
+        old = self._assets.get(asset.name)
+        if old is not None and old.digest == asset.digest:
+            # Same pixels: keep the identity, so what's shown stays valid.
+            asset.generation = old.generation
+        self._assets[asset.name] = asset
+        if old is not None:
+            self._release(old.data)
+
+    def _release(self, data: AssetData) -> None:
+        data.refs -= 1
+        if data.refs <= 0 and self._payloads.get(data.digest) is data:
+            del self._payloads[data.digest]
+            self._invalidate(data.digest)
+
+    def _alive(self, asset: Asset) -> bool:
+        """False once `asset`'s payload has been freed (results would be stale)."""
+        return self._payloads.get(asset.digest) is asset.data
+
+    def _build_asset(
+        self, name: str, raw: bytes, path: Optional[Path] = None
+    ) -> Asset:
+        """Validate `raw` and index its frames without retaining decoded pixels.
+
+        Bytes already held under another name share that payload; bytes
+        indexed by a previous run are taken from the disk cache. Neither is
+        opened again.
+        """
+        digest = hashlib.sha256(raw).hexdigest()
+        data = self._payloads.get(digest)
+        if data is None:
+            meta = self._disk.get_meta(digest) if self._disk is not None else None
+            if meta is not None:
+                durations = [int(d) for d in meta["frame_durations_ms"]]
+            else:
+                durations = self._index_frames(raw)
+                if self._disk is not None:
+                    self._persist(
+                        self._disk.put_meta, digest, {"frame_durations_ms": durations}
+                    )
+            data = AssetData(
+                digest=digest,
+                source=raw,
+                frame_durations_ms=durations,
+                window=self._frame_window,
+            )
+        return Asset(
+            name=name, data=data, generation=next(self._generations), path=path
+        )
+
+    def _persist(self, fn: Callable[..., None], *args: Any) -> None:
+        """Run a disk cache write (temp file + rename) on the thread pool."""
+        fut = self._executor.submit(fn, *args)
+        with self._writes_lock:
+            self._writes.add(fut)
+        fut.add_done_callback(self._write_done)
+
+    def _write_done(self, fut: Future) -> None:
+        with self._writes_lock:
+            self._writes.discard(fut)
+        if not fut.cancelled() and fut.exception() is not None:
+            logger.warning("disk cache write failed: %s", fut.exception())
+
+    def _index_frames(self, raw: bytes) -> list[int]:
         try:
             img = Image.open(io.BytesIO(raw))
             img.load()
         except (UnidentifiedImageError, OSError) as e:
             raise InvalidAssetDataError(f"image decode failed: {e}") from e
 
-        frames: list[Image.Image] = []
         durations: list[int] = []
         try:
             n_frames = getattr(img, "n_frames", 1)
@@ -100,53 +543,246 @@ class AssetRegistry:
 
         for i in range(n_frames):
             img.seek(i)
-            frame = img.convert("RGB")
-            frames.append(frame.copy())
             duration = img.info.get("duration", 100)
             durations.append(int(duration) if duration else 100)
-
-        return Asset(
-            name=name,
-            frames=frames,
-            frame_durations_ms=durations,
-            size_bytes=len(raw),
-        )
+        return durations
 
     def get(self, name: str) -> Asset:
         asset = self._assets.get(name)
         if asset is None:
-            raise AssetNotFoundError(name)
+            entry = self._static.get(name)
+            if entry is None:
+                raise AssetNotFoundError(name)
+            asset = self._load_static(name, entry)
         return asset
 
     def remove(self, name: str) -> None:
-        if name in self._assets:
-            del self._assets[name]
-            self._invalidate_resize_cache(name)
+        self._static.pop(name, None)
+        asset = self._assets.pop(name, None)
+        if asset is not None:
+            self._release(asset.data)
+
+    @property
+    def max_size_bytes(self) -> int:
+        return self._max_size
 
     def list(self) -> list[dict]:
-        return [
-            {"name": a.name, "animated": a.animated, "size_bytes": a.size_bytes}
+        """Loaded assets, then static files indexed but not read yet.
+
+        Pending static entries are reported from their directory metadata
+        only (`loaded` False), so listing never decodes the assets dir.
+        """
+        loaded = [
+            {
+                "name": a.name,
+                "loaded": True,
+                "animated": a.animated,
+                "size_bytes": a.size_bytes,
+                # Shared payloads report their full size under every name.
+                "resident_bytes": a.data.resident_bytes,
+                "digest": a.digest,
+                "shared_by": a.data.refs,
+            }
             for a in self._assets.values()
         ]
+        pending = [
+            {
+                "name": name,
+                "loaded": False,
+                "path": str(entry.path),
+                "size_bytes": entry.size_bytes,
+            }
+            for name, entry in self._static.items()
+        ]
+        return loaded + pending
 
     def get_resized(self, name: str, target_size: tuple[int, int]) -> Image.Image:
-        return self.get_resized_frames(name, target_size)[0]
+        return self._resized(name, target_size, 0)
 
     def get_resized_frames(
         self, name: str, target_size: tuple[int, int]
     ) -> list[Image.Image]:
         asset = self.get(name)
-        out: list[Image.Image] = []
-        for idx, frame in enumerate(asset.frames):
-            key = (name, target_size, idx)
-            cached = self._resize_cache.get(key)
-            if cached is None:
-                cached = frame.resize(target_size, Image.Resampling.LANCZOS)
-                self._resize_cache[key] = cached
-            out.append(cached)
-        return out
-
-    def _invalidate_resize_cache(self, name: str) -> None:
-        keys = [k for k in self._resize_cache if k[0] == name]
-        for k in keys:
-            del self._resize_cache[k]
+        return [self._resized(name, target_size, i) for i in range(asset.frame_count)]
+
+    def _resized(self, name: str, target_size: tuple[int, int], index: int) -> Image.Image:
+        asset = self.get(name)
+        key = (asset.digest, "resized", target_size, index)
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = _resize_frame(asset.data, index, target_size)
+            self._cache[key] = cached
+        return cached
+
+    async def get_resized_async(
+        self, name: str, target_size: tuple[int, int], index: int = 0
+    ) -> Image.Image:
+        """Like `get_resized`, but a cache miss never blocks the event loop."""
+        asset = self.get(name)
+        return await self._compute(
+            (asset.digest, "resized", target_size, index),
+            _resize_frame, asset.data, index, target_size,
+        )
+
+    async def get_native_async(self, name: str, device: Device, index: int = 0) -> bytes:
+        asset = self.get(name)
+        key = _native_key(asset, device, index)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        if self._disk is not None:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(
+                self._executor, self._read_disk, asset, device, index
+            )
+            if data is not None:
+                if self._alive(asset):
+                    self._cache[key] = data
+                return data
+        img = await self.get_resized_async(name, device.image_size, index)
+        return await self._compute(key, self._encode, asset, device, index, img)
+
+    def _read_disk(self, asset: Asset, device: Device, index: int) -> Optional[bytes]:
+        if self._disk is None:
+            return None
+        return self._disk.get_frame(_disk_key(asset, device, index))
+
+    def _encode(
+        self, asset: Asset, device: Device, index: int, img: Image.Image
+    ) -> bytes:
+        data = device.encode_key_image(img)
+        if self._disk is not None:
+            self._disk.put_frame(_disk_key(asset, device, index), data)
+        return data
+
+    async def _compute(self, key: tuple, fn: Callable[..., Any], *args: Any) -> Any:
+        """Return the cached `key`, computing misses once on the thread pool."""
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            self._inflight[key] = fut
+            fut.add_done_callback(partial(self._store, key))
+        # Shield: one waiter being cancelled mustn't cancel the shared work.
+        return await asyncio.shield(fut)
+
+    def _store(self, key: Hashable, fut: asyncio.Future) -> None:
+        if self._inflight.get(key) is not fut:
+            return  # invalidated while in flight; result is stale
+        del self._inflight[key]
+        if key[0] not in self._payloads:
+            return  # payload freed before the work was even scheduled
+        if not fut.cancelled() and fut.exception() is None:
+            self._cache[key] = fut.result()
+
+    def _native_keys(self, asset: Asset, device: Device) -> list[tuple]:
+        return [_native_key(asset, device, i) for i in range(asset.frame_count)]
+
+    def _use_pool(self, asset: Asset, device: Device) -> bool:
+        return (
+            self._pool is not None
+            and asset.frame_count >= _POOL_MIN_FRAMES
+            and not all(k in self._cache for k in self._native_keys(asset, device))
+        )
+
+    async def get_native_frames_async(self, name: str, device: Device) -> list[bytes]:
+        """Every frame of `name` encoded for `device`; large animations use the pool."""
+        asset = self.get(name)
+        if not self._use_pool(asset, device):
+            return list(await asyncio.gather(*(
+                self.get_native_async(name, device, i) for i in range(asset.frame_count)
+            )))
+        keys = self._native_keys(asset, device)
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(
+            self._executor, self._read_disk_frames, asset, device
+        )
+        if stored is not None:
+            prepared = stored
+        else:
+            encoder = device.key_encoder()
+            prepared = await self._pool.prepare(
+                asset.source, asset.frame_count, device.image_size, encoder
+            )
+            if encoder is None:
+                prepared = [
+                    device.encode_key_image(Image.frombytes("RGB", device.image_size, b))
+                    for b in prepared
+                ]
+            if self._disk is not None:
+                await loop.run_in_executor(
+                    self._executor, self._write_disk_frames, asset, device, prepared
+                )
+        if self._alive(asset):  # not freed while we awaited
+            self._cache.update(zip(keys, prepared))
+        return prepared
+
+    def _read_disk_frames(self, asset: Asset, device: Device) -> Optional[list[bytes]]:
+        """Every frame of `asset` from disk, or None unless all are there."""
+        frames: list[bytes] = []
+        for i in range(asset.frame_count):
+            data = self._read_disk(asset, device, i)
+            if data is None:
+                return None
+            frames.append(data)
+        return frames
+
+    def _write_disk_frames(
+        self, asset: Asset, device: Device, frames: list[bytes]
+    ) -> None:
+        for i, data in enumerate(frames):
+            self._disk.put_frame(_disk_key(asset, device, i), data)
+
+    async def iter_native_frames(
+        self, name: str, device: Device, start: int = 0
+    ) -> AsyncIterator[bytes]:
+        """Yield encoded frames from `start` on, in order, each as soon as it's ready."""
+        asset = self.get(name)
+        if self._use_pool(asset, device):
+            for data in (await self.get_native_frames_async(name, device))[start:]:
+                yield data
+            return
+        tasks = [asyncio.ensure_future(self.get_native_async(name, device, i))
+                 for i in range(start, asset.frame_count)]
+        try:
+            for t in tasks:
+                yield await t
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    def close(self) -> None:
+        with self._writes_lock:
+            pending = list(self._writes)
+        wait(pending, timeout=5.0)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._pool is not None:
+            self._pool.close()
+
+    async def get_native_tiles_async(
+        self, name: str, device: Device
+    ) -> list[tuple[bytes, ...]]:
+        asset = self.get(name)
+        return list(await asyncio.gather(*(
+            self._compute(
+                _native_tiles_key(asset, device, idx),
+                self._encode_tiles, asset.data, device, idx,
+            )
+            for idx in range(asset.frame_count)
+        )))
+
+    @staticmethod
+    def _encode_tiles(data: AssetData, device: Device, index: int) -> tuple[bytes, ...]:
+        tiles = _tile_frame(data, index, device.key_layout, device.image_size)
+        return tuple(device.encode_key_image(t) for t in tiles)
+
+    def cache_stats(self) -> dict:
+        return self._cache.stats()
+
+    def _invalidate(self, digest: str) -> None:
+        self._cache.invalidate(digest)
+        # In-flight work is bounded by the worker count; a scan is cheap.
+        for k in [k for k in self._inflight if k[0] == digest]:
+            del self._inflight[k]
@@ -13,6 +13,11 @@ class UnknownCommandError(Exception):
     """Raised when dispatching an unregistered command."""
 
 
+class InvalidParamsError(ValueError):
+    """Raised by a handler for missing or malformed parameters."""
+    error_code = "invalid_params"
+
+
 class CommandRegistry:
     """In-memory registry mapping `cmd` strings to handlers."""
 
@@ -4,6 +4,7 @@ from abc import ABC, abstractmethod
 from enum import Enum
 from typing import Callable, Optional
 
+import PIL
 from PIL import Image
 
 
@@ -31,6 +32,7 @@ class Device(ABC):
     id: str
     model: DeviceModel
     key_count: int
+    key_layout: tuple[int, int]  # (rows, cols)
     image_size: tuple[int, int]
     image_format: ImageFormat
     has_screen: bool
@@ -39,6 +41,38 @@ class Device(ABC):
     @abstractmethod
     def set_key_image(self, button: int, image: Image.Image) -> None: ...
 
+    @abstractmethod
+    def encode_key_image(self, image: Image.Image) -> bytes:
+        """Convert a key-sized RGB image to the bytes `set_key_native` expects."""
+
+    @abstractmethod
+    def set_key_native(self, button: int, data: bytes) -> None:
+        """Push an image already encoded by `encode_key_image`."""
+
+    def key_encoder(self) -> Optional[Callable[[Image.Image], bytes]]:
+        """A picklable equivalent of `encode_key_image`, or None if there is none.
+
+        Used to encode frames in worker processes.
+        """
+        return None
+
+    def encoder_settings(self) -> str:
+        """Everything besides size that determines `encode_key_image` output.
+
+        Used to key persisted encoded frames, so it includes the Pillow
+        version that does the encoding.
+        """
+        return f"{self.image_format.value}:pillow={PIL.__version__}"
+
+    def set_keys_native(self, images: dict[int, bytes]) -> None:
+        """Push several encoded key images in one pass."""
+        for button, data in images.items():
+            self.set_key_native(button, data)
+
+    def key_write_pending(self, button: int) -> bool:
+        """True if an earlier image for `button` is still waiting to be written."""
+        return False
+
     @abstractmethod
     def clear_key(self, button: int) -> None: ...
 
@@ -64,16 +98,19 @@ class MockDevice(Device):
         image_format: ImageFormat = ImageFormat.JPEG,
         has_screen: bool = False,
         has_dial: bool = False,
+        key_layout: Optional[tuple[int, int]] = None,
     ) -> None:
         self.id = id
         self.model = model
         self.key_count = key_count
+        self.key_layout = key_layout or (1, key_count)
         self.image_size = image_size
         self.image_format = image_format
         self.has_screen = has_screen
         self.has_dial = has_dial
 
         self.set_key_calls: list[tuple[int, Image.Image]] = []
+        self.encode_count = 0
         self.cleared_keys: list[int] = []
         self.brightness: Optional[int] = None
         self._callback: Optional[KeyCallback] = None
@@ -82,6 +119,18 @@ class MockDevice(Device):
     def set_key_image(self, button: int, image: Image.Image) -> None:
         self.set_key_calls.append((button, image))
 
+    def encode_key_image(self, image: Image.Image) -> bytes:
+        # Raw RGB is enough for tests: lossless and trivially reversible.
+        self.encode_count += 1
+        return image.convert("RGB").tobytes()
+
+    def encoder_settings(self) -> str:
+        return "raw-rgb"
+
+    def set_key_native(self, button: int, data: bytes) -> None:
+        img = Image.frombytes("RGB", self.image_size, data)
+        self.set_key_calls.append((button, img))
+
     def last_image_for(self, button: int) -> Optional[Image.Image]:
         for k, img in reversed(self.set_key_calls):
             if k == button:
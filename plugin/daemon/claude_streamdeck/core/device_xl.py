@@ -1,18 +1,50 @@
 """Concrete Device implementation for the Stream Deck XL."""
 
 import logging
-from typing import Optional
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
+from typing import Callable, Optional
 
+import PIL
 from PIL import Image
 from StreamDeck.ImageHelpers import PILHelper
 
 from .device import Device, DeviceModel, ImageFormat, KeyCallback
+from .key_writer import KeyWriter
 
 logger = logging.getLogger(__name__)
 
+# PILHelper saves key images at this JPEG quality. It's fixed inside the
+# streamdeck library, so that library's version is part of the encoder
+# settings as well.
+_JPEG_QUALITY = 100
+try:
+    _STREAMDECK_VERSION = version("streamdeck")
+except PackageNotFoundError:  # pragma: no cover - running from a source tree
+    _STREAMDECK_VERSION = "unknown"
+
+
+class _KeyFormat:
+    """Stands in for a deck in `PILHelper`, which only reads the key format."""
+
+    def __init__(self, fmt: dict) -> None:
+        self._fmt = fmt
+
+    def key_image_format(self) -> dict:
+        return self._fmt
+
+
+def encode_key_format(fmt: dict, image: Image.Image) -> bytes:
+    """Encode a key image for a deck with key format `fmt` (picklable)."""
+    return PILHelper.to_native_format(_KeyFormat(fmt), image)
+
 
 class XLDevice(Device):
-    """Stream Deck XL adapter over the `streamdeck` library."""
+    """Stream Deck XL adapter over the `streamdeck` library.
+
+    USB writes go through a per-device `KeyWriter` thread so a slow or
+    stalled deck never blocks the asyncio loop.
+    """
 
     model = DeviceModel.XL
     has_screen = False
@@ -22,11 +54,14 @@ class XLDevice(Device):
         self.id = id
         self._dev = hid_device
         self.key_count = hid_device.key_count()
+        self.key_layout = tuple(hid_device.key_layout())
         fmt = hid_device.key_image_format()
         self.image_size = fmt["size"]
         self.image_format = ImageFormat(str(fmt["format"]).lower())
         self._callback: Optional[KeyCallback] = None
+        self._black: Optional[bytes] = None
         self._open()
+        self._writer = KeyWriter(name=f"hid-writer-{id}")
 
     def _open(self) -> None:
         self._dev.open()
@@ -42,15 +77,43 @@ class XLDevice(Device):
                 logger.exception("XL key callback failed")
 
     def set_key_image(self, button: int, image: Image.Image) -> None:
-        native = PILHelper.to_native_format(self._dev, image)
-        self._dev.set_key_image(button, native)
+        self.set_key_native(button, self.encode_key_image(image))
+
+    def encode_key_image(self, image: Image.Image) -> bytes:
+        return PILHelper.to_native_format(self._dev, image)
+
+    def key_encoder(self) -> Callable[[Image.Image], bytes]:
+        return partial(encode_key_format, dict(self._dev.key_image_format()))
+
+    def encoder_settings(self) -> str:
+        fmt = self._dev.key_image_format()
+        return (
+            f"{fmt['format']}:quality={_JPEG_QUALITY}:flip={fmt['flip']}"
+            f":rotation={fmt['rotation']}:pillow={PIL.__version__}"
+            f":streamdeck={_STREAMDECK_VERSION}"
+        )
+
+    def set_key_native(self, button: int, data: bytes) -> None:
+        self._writer.submit(button, partial(self._dev.set_key_image, button, data))
+
+    def set_keys_native(self, images: dict[int, bytes]) -> None:
+        self._writer.submit_many(
+            (button, partial(self._dev.set_key_image, button, data))
+            for button, data in images.items()
+        )
+
+    def key_write_pending(self, button: int) -> bool:
+        return self._writer.is_pending(button)
 
     def clear_key(self, button: int) -> None:
-        black = Image.new("RGB", self.image_size, (0, 0, 0))
-        self.set_key_image(button, black)
+        if self._black is None:
+            black = Image.new("RGB", self.image_size, (0, 0, 0))
+            self._black = self.encode_key_image(black)
+        self.set_key_native(button, self._black)
 
     def set_brightness(self, value: int) -> None:
-        self._dev.set_brightness(max(0, min(100, value)))
+        value = max(0, min(100, value))
+        self._writer.submit("brightness", partial(self._dev.set_brightness, value))
 
     def set_key_callback(self, callback: KeyCallback) -> None:
         self._callback = callback
@@ -59,6 +122,7 @@ class XLDevice(Device):
         try:
             for k in range(self.key_count):
                 self.clear_key(k)
+            self._writer.close()
             self._dev.reset()
         finally:
             try:
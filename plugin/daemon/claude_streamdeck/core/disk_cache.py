@@ -0,0 +1,162 @@
+"""Content-addressed on-disk cache of encoded frames, asset metadata and sources."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# A hit refreshes an entry's mtime (its age for GC) at most this often.
+_TOUCH_INTERVAL_S = 3600.0
+
+# Writing this fraction of max_bytes since the last gc() starts another.
+_GC_WRITE_FRACTION = 0.1
+
+
+class DiskCache:
+    """Files named by the sha256 of what produced them, under `root`.
+
+    Encoded frames live in `frames/` and are keyed by the source digest,
+    target size, the device's encoder settings and the frame index, so an
+    entry can never be served for different pixels or a different encoder.
+    Per-asset metadata (frame durations) lives in `meta/` keyed by the source
+    digest alone. Together they let a warm restart repaint keys without
+    decoding, resizing or encoding anything. Uploaded sources are kept in
+    `sources/`, so clients can rebind content by digest after a restart
+    instead of sending it again.
+
+    Entries are written atomically (temp file + rename) and read with one
+    sized read straight into the returned bytes. `gc()` drops entries unused
+    for `max_age_s`, then the least recently used ones until the total is
+    within `max_bytes`; it also runs on its own once a tenth of `max_bytes`
+    has been written since the last pass.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, max_age_s: float) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        # Bytes written since the last gc(); writes come from pool threads.
+        self._written = 0
+        self._lock = threading.Lock()
+        self._gc_lock = threading.Lock()
+
+    @staticmethod
+    def frame_key(
+        digest: str, size: tuple[int, int], encoder: str, index: int
+    ) -> str:
+        spec = f"{digest}:{size[0]}x{size[1]}:{encoder}:{index}"
+        return hashlib.sha256(spec.encode()).hexdigest()
+
+    def get_frame(self, key: str) -> Optional[bytes]:
+        return self._read(self._path("frames", key))
+
+    def put_frame(self, key: str, data: bytes) -> None:
+        self._write(self._path("frames", key), data)
+
+    def get_meta(self, digest: str) -> Optional[dict[str, Any]]:
+        raw = self._read(self._path("meta", digest))
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def put_meta(self, digest: str, meta: dict[str, Any]) -> None:
+        self._write(self._path("meta", digest), json.dumps(meta).encode())
+
+    def get_source(self, digest: str) -> Optional[bytes]:
+        return self._read(self._path("sources", digest))
+
+    def put_source(self, digest: str, raw: bytes) -> None:
+        path = self._path("sources", digest)
+        if not path.exists():
+            self._write(path, raw)
+
+    def gc(self) -> int:
+        """Remove expired and least recently used entries. Returns the count."""
+        if not self._gc_lock.acquire(blocking=False):
+            return 0  # a pass is already running on another thread
+        try:
+            with self._lock:
+                self._written = 0
+            return self._collect()
+        finally:
+            self._gc_lock.release()
+
+    def _collect(self) -> int:
+        entries: list[tuple[float, int, Path]] = []
+        for sub in ("frames", "meta", "sources"):
+            base = self.root / sub
+            if not base.is_dir():
+                continue
+            for path in base.glob("*/*"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        cutoff = time.time() - self.max_age_s
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.info("disk cache gc removed %d entries", removed)
+        return removed
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.root / kind / key[:2] / key
+
+    def _read(self, path: Path) -> Optional[bytes]:
+        try:
+            with path.open("rb") as f:
+                st = os.fstat(f.fileno())
+                if st.st_size == 0:
+                    return None
+                data = f.read(st.st_size)
+        except OSError:
+            return None
+        if len(data) != st.st_size:
+            return None  # replaced or truncated under us
+        if time.time() - st.st_mtime > _TOUCH_INTERVAL_S:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return data
+
+    def _write(self, path: Path, data: bytes) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            logger.warning("disk cache write failed: %s", path, exc_info=True)
+            return
+        with self._lock:
+            self._written += len(data)
+            due = self._written >= self.max_bytes * _GC_WRITE_FRACTION
+        if due:
+            self.gc()
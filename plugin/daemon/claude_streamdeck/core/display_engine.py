@@ -1,36 +1,70 @@
 """Drives static images and animations onto Devices via the AssetRegistry."""
 
 import asyncio
+import itertools
 import logging
+from collections import Counter
 from typing import Literal, Optional
 
-from PIL import Image
-
-from .asset_registry import AssetRegistry
+from .animation_scheduler import Animation, AnimationScheduler, Frame
+from .asset_registry import Asset, AssetNotFoundError, AssetRegistry
 from .device import Device
 
 logger = logging.getLogger(__name__)
 
 
+# Content identity of what a button shows:
+# (asset name, generation, frame, tile index or -1 for a whole-key image).
+Identity = tuple[str, int, int, int]
+
+# Identity recorded for a cleared (black) key.
+_CLEARED: Identity = ("", 0, -1, -1)
+
+
 class ButtonOutOfRangeError(Exception):
-    pass
+    error_code = "button_out_of_range"
 
 
 class DeviceNotFoundError(Exception):
-    pass
+    error_code = "device_not_found"
 
 
 class DisplayEngine:
-    """Per-(device, button) display state with cooperative animation tasks."""
+    """Per-(device, button) display state; animations share one scheduler.
+
+    The engine remembers the content identity last written to each static
+    button, so re-sending what a key already shows costs no resize, encode
+    or USB transfer. Such short-circuited writes are counted per button.
+
+    Animated assets start as soon as their first frame is ready; the rest
+    are appended by a background task while the animation already runs.
+
+    Every request takes a fresh token for the buttons it paints before it
+    awaits any image; a request finishing after a newer one for the same
+    button has taken over drops its write, so the last request wins.
+    """
 
     def __init__(self, assets: AssetRegistry) -> None:
         self._assets = assets
         self._devices: dict[str, Device] = {}
-        # (device_id, button) -> asyncio.Task running an animation loop
-        self._animations: dict[tuple[str, int], asyncio.Task] = {}
+        self._scheduler = AnimationScheduler()
+        # (device_id, button) -> Animation registered with the scheduler
+        self._animations: dict[tuple[str, int], Animation] = {}
+        # Animation -> task still preparing its remaining frames
+        self._fillers: dict[Animation, asyncio.Task] = {}
+        # Animation -> (asset name, tiled) for animations played from an asset
+        self._sources: dict[Animation, tuple[str, bool]] = {}
+        # (device_id, button) -> identity of the static content shown
+        self._shown: dict[tuple[str, int], Identity] = {}
+        self._skipped: Counter[tuple[str, int]] = Counter()
+        # (device_id, button) -> token of the latest request for that button
+        self._claims: dict[tuple[str, int], int] = {}
+        self._tokens = itertools.count(1)
 
     def register_device(self, device: Device) -> None:
         self._devices[device.id] = device
+        # A (re)attached device starts blank; forget what we think it shows.
+        self._forget_device(device.id)
 
     def unregister_device(self, device_id: str) -> None:
         self._devices.pop(device_id, None)
@@ -45,18 +79,140 @@ class DisplayEngine:
         if button < 0 or button >= device.key_count:
             raise ButtonOutOfRangeError(f"{button} not in [0,{device.key_count})")
 
+    def _claim(self, device_id: str, button: int) -> int:
+        token = self._claims[(device_id, button)] = next(self._tokens)
+        return token
+
+    def _superseded(self, device_id: str, button: int, token: int) -> bool:
+        return self._claims.get((device_id, button)) != token
+
+    def _unchanged(self, device_id: str, button: int, identity: Identity) -> bool:
+        key = (device_id, button)
+        if self._shown.get(key) == identity:
+            self._skipped[key] += 1
+            return True
+        return False
+
     async def set_image(self, device_id: str, button: int, asset_name: str) -> None:
         d = self._device(device_id)
         self._check_button(d, button)
-        await self._cancel_animation(device_id, button)
-        img = self._assets.get_resized(asset_name, d.image_size)
-        d.set_key_image(button, img)
+        asset = self._assets.get(asset_name)
+        identity = (asset.name, asset.generation, 0, -1)
+        token = self._claim(device_id, button)
+        if self._unchanged(device_id, button, identity):
+            return
+        data = await self._assets.get_native_async(asset_name, d)
+        if self._superseded(device_id, button, token):
+            return
+        self._cancel_animation(device_id, button)
+        d.set_key_native(button, data)
+        self._shown[(device_id, button)] = identity
 
     async def clear(self, device_id: str, button: int) -> None:
         d = self._device(device_id)
         self._check_button(d, button)
-        await self._cancel_animation(device_id, button)
+        self._claim(device_id, button)
+        if self._unchanged(device_id, button, _CLEARED):
+            return
+        self._cancel_animation(device_id, button)
         d.clear_key(button)
+        self._shown[(device_id, button)] = _CLEARED
+
+    async def set_many(
+        self, entries: list[tuple[str, int, Optional[str]]]
+    ) -> list[Optional[Exception]]:
+        """Paint several (device_id, button, asset) entries in one pass.
+
+        An asset of None clears the key. Distinct images are prepared
+        concurrently off the loop, then each device gets its writes as a
+        single batch. Returns, per entry, None or the exception it raised.
+        """
+        errors: list[Optional[Exception]] = [None] * len(entries)
+        todo: list[tuple[int, Device, int, Optional[str], Identity, int]] = []
+        for i, (device_id, button, asset_name) in enumerate(entries):
+            try:
+                d = self._device(device_id)
+                self._check_button(d, button)
+                if asset_name is None:
+                    identity = _CLEARED
+                else:
+                    asset = self._assets.get(asset_name)
+                    identity = (asset.name, asset.generation, 0, -1)
+            except Exception as e:
+                errors[i] = e
+                continue
+            token = self._claim(device_id, button)
+            if not self._unchanged(device_id, button, identity):
+                todo.append((i, d, button, asset_name, identity, token))
+
+        jobs = {(name, d.id): d for _, d, _, name, _, _ in todo if name is not None}
+        prepared = await asyncio.gather(
+            *(self._assets.get_native_async(name, d) for (name, _), d in jobs.items()),
+            return_exceptions=True,
+        )
+        natives = dict(zip(jobs, prepared))
+
+        batches: dict[str, dict[int, bytes]] = {}
+        for i, d, button, asset_name, identity, token in todo:
+            if self._superseded(d.id, button, token):
+                continue
+            if asset_name is None:
+                self._cancel_animation(d.id, button)
+                d.clear_key(button)
+            else:
+                data = natives[(asset_name, d.id)]
+                if isinstance(data, Exception):
+                    errors[i] = data
+                    continue
+                self._cancel_animation(d.id, button)
+                batches.setdefault(d.id, {})[button] = data
+            self._shown[(d.id, button)] = identity
+        for device_id, images in batches.items():
+            self._devices[device_id].set_keys_native(images)
+        return errors
+
+    async def set_tiled(
+        self,
+        device_id: str,
+        asset_name: str,
+        loop: bool = True,
+        buttons: Optional[list[int]] = None,
+    ) -> None:
+        """Spread one image over the whole key grid, one tile per key.
+
+        Animated assets run as a single phase-locked group over every key.
+        With `buttons`, only those keys get their tile; the rest are left alone.
+        """
+        d = self._device(device_id)
+        rows, cols = d.key_layout
+        if rows * cols != d.key_count:
+            raise ValueError(f"{d.id} has no regular key grid")
+        if buttons is None:
+            keys = tuple(range(d.key_count))
+        else:
+            keys = tuple(buttons)
+            for b in keys:
+                self._check_button(d, b)
+        asset = self._assets.get(asset_name)
+        tokens = [self._claim(device_id, b) for b in keys]
+        tiles = await self._assets.get_native_tiles_async(asset_name, d)
+        current = [b for b, t in zip(keys, tokens) if not self._superseded(device_id, b, t)]
+        if asset.animated and len(current) < len(keys):
+            return  # part of the grid was repainted meanwhile
+        for b in current:
+            self._cancel_animation(device_id, b)
+        if asset.animated:
+            sequence = [(tuple(frame[b] for b in keys), duration)
+                        for frame, duration in zip(tiles, asset.frame_durations_ms)]
+            self._start(d, keys, sequence, loop, source=(asset.name, True))
+            return
+        images: dict[int, bytes] = {}
+        for b in current:
+            identity = (asset.name, asset.generation, 0, b)
+            if not self._unchanged(device_id, b, identity):
+                images[b] = tiles[0][b]
+                self._shown[(device_id, b)] = identity
+        d.set_keys_native(images)
 
     async def animate(
         self,
@@ -68,73 +224,238 @@ class DisplayEngine:
     ) -> None:
         d = self._device(device_id)
         self._check_button(d, button)
-        await self._cancel_animation(device_id, button)
+        self._cancel_animation(device_id, button)
+        token = self._claim(device_id, button)
 
-        # Build (image, duration_ms) sequence
-        sequence: list[tuple[Image.Image, int]] = []
         if asset is not None:
+            # Start on the first frame; the rest join as they're prepared.
             a = self._assets.get(asset)
-            imgs = self._assets.get_resized_frames(asset, d.image_size)
-            for img, dur in zip(imgs, a.frame_durations_ms):
-                sequence.append((img, dur))
-        elif frames is not None:
-            for f in frames:
-                img = self._assets.get_resized(f["asset"], d.image_size)
-                sequence.append((img, int(f.get("duration_ms", 100))))
+            first = await self._assets.get_native_async(asset, d, 0)
+            if self._superseded(device_id, button, token):
+                return
+            anim = self._start(
+                d, (button,), [((first,), a.frame_durations_ms[0])], loop,
+                complete=not a.animated, source=(a.name, False),
+            )
+            if anim is not None and a.animated:
+                self._fillers[anim] = asyncio.create_task(self._fill(anim, a, token))
+            return
+
+        # Build ((native bytes,), duration_ms) sequence
+        sequence: list[Frame] = []
+        if frames is not None:
+            natives = await asyncio.gather(
+                *(self._assets.get_native_async(f["asset"], d) for f in frames)
+            )
+            for f, data in zip(frames, natives):
+                sequence.append(((data,), int(f.get("duration_ms", 100))))
         else:
             raise ValueError("animate requires `asset` or `frames`")
 
-        if not sequence:
+        if self._superseded(device_id, button, token):
             return
+        self._start(d, (button,), sequence, loop)
 
-        task = asyncio.create_task(
-            self._animation_loop(d, button, sequence, loop)
-        )
-        self._animations[(device_id, button)] = task
+    async def animate_group(
+        self,
+        device_id: str,
+        buttons: list[int],
+        frames: list[dict],
+        loop: bool = True,
+    ) -> None:
+        """Animate several buttons phase-locked from one scheduler entry.
+
+        Each frame is `{"assets": [...], "duration_ms": n}` with one asset
+        per button, in `buttons` order; all keys advance on the same tick.
+        Changing or stopping any member button stops the whole group.
+        """
+        d = self._device(device_id)
+        if not buttons or len(set(buttons)) != len(buttons):
+            raise ValueError("animate_group requires distinct `buttons`")
+        for b in buttons:
+            self._check_button(d, b)
+        for f in frames:
+            names = f["assets"]
+            if len(names) != len(buttons):
+                raise ValueError(
+                    f"frame has {len(names)} assets for {len(buttons)} buttons"
+                )
+            for n in names:
+                self._assets.get(n)
+        tokens = [self._claim(device_id, b) for b in buttons]
+        sequence: list[Frame] = []
+        for f in frames:
+            names = f["assets"]
+            images = await asyncio.gather(
+                *(self._assets.get_native_async(n, d) for n in names)
+            )
+            sequence.append((tuple(images), int(f.get("duration_ms", 100))))
+        if any(self._superseded(device_id, b, t) for b, t in zip(buttons, tokens)):
+            return
+        for b in buttons:
+            self._cancel_animation(device_id, b)
+        self._start(d, tuple(buttons), sequence, loop)
 
-    async def _animation_loop(
+    def _start(
         self,
         device: Device,
-        button: int,
-        sequence: list[tuple[Image.Image, int]],
+        buttons: tuple[int, ...],
+        sequence: list[Frame],
         loop: bool,
-    ) -> None:
+        complete: bool = True,
+        source: Optional[tuple[str, bool]] = None,
+    ) -> Optional[Animation]:
+        if not sequence:
+            return None
+        for b in buttons:  # another request may have started one while we awaited
+            self._cancel_animation(device.id, b)
+        anim = Animation(device=device, buttons=buttons, sequence=sequence,
+                         loop=loop, complete=complete)
+        for b in buttons:
+            self._shown.pop((device.id, b), None)
+            self._animations[(device.id, b)] = anim
+        if source is not None:
+            self._sources[anim] = source
+        self._scheduler.add(anim)
+        return anim
+
+    async def _fill(self, anim: Animation, asset: Asset, token: int) -> None:
+        """Append frames 1.. of `asset` to a running animation as they become ready.
+
+        If the asset is replaced meanwhile, the animation is restarted from
+        the new content rather than mixing old and new frames, unless a newer
+        request than the one holding `token` has taken the button since.
+        """
+        durations = asset.frame_durations_ms
+        replaced = False
         try:
-            while True:
-                for img, dur in sequence:
-                    device.set_key_image(button, img)
-                    await asyncio.sleep(dur / 1000.0)
-                if not loop:
-                    return
+            idx = 1
+            async for data in self._assets.iter_native_frames(asset.name, anim.device, 1):
+                if idx >= len(durations) or self._replaced(asset):
+                    replaced = True
+                    break
+                anim.sequence.append(((data,), durations[idx]))
+                idx += 1
         except asyncio.CancelledError:
-            pass
+            raise
+        except Exception:
+            logger.exception("preparing frames of %s failed", asset.name)
+        finally:
+            anim.complete = True
+            self._fillers.pop(anim, None)
+        device_id, button = anim.device.id, anim.buttons[0]
+        if replaced and not anim.cancelled and not self._superseded(
+            device_id, button, token
+        ):
+            try:
+                await self.animate(device_id, button, asset=asset.name, loop=anim.loop)
+            except AssetNotFoundError:
+                pass  # removed: keep playing the frames we have
+            except Exception:
+                logger.exception("restarting %s after it changed failed", asset.name)
+
+    def _replaced(self, asset: Asset) -> bool:
+        try:
+            return self._assets.get(asset.name).generation != asset.generation
+        except AssetNotFoundError:
+            return True
 
     async def stop_animation(
         self, device_id: str, button: int, mode: Literal["freeze", "clear"]
     ) -> None:
         d = self._device(device_id)
         self._check_button(d, button)
-        await self._cancel_animation(device_id, button)
+        anim = self._cancel_animation(device_id, button)
+        buttons = anim.buttons if anim is not None else (button,)
+        for b in buttons:
+            self._claim(device_id, b)
         if mode == "clear":
-            d.clear_key(button)
+            for b in buttons:
+                d.clear_key(b)
+                self._shown[(device_id, b)] = _CLEARED
+
+    def _cancel_animation(self, device_id: str, button: int) -> Optional[Animation]:
+        """Stop the animation covering `button`, including its whole group."""
+        anim = self._animations.pop((device_id, button), None)
+        if anim is not None:
+            self._scheduler.cancel(anim)
+            self._sources.pop(anim, None)
+            filler = self._fillers.pop(anim, None)
+            if filler is not None:
+                filler.cancel()
+            for b in anim.buttons:
+                self._animations.pop((device_id, b), None)
+        return anim
 
-    async def _cancel_animation(self, device_id: str, button: int) -> None:
-        task = self._animations.pop((device_id, button), None)
-        if task is not None:
-            task.cancel()
+    async def refresh_asset(self, name: str) -> None:
+        """Repaint every button showing `name`, e.g. after its file changed.
+
+        Static keys, tiled images and animations played from the asset are
+        redrawn the way they were requested; other buttons are untouched.
+        """
+        keys: list[tuple[str, int, Optional[str]]] = []
+        # device_id -> (buttons showing one of its tiles, loop)
+        tiled: dict[str, tuple[list[int], bool]] = {}
+        animated: list[tuple[str, int, bool]] = []
+        for (dev_id, button), identity in self._shown.items():
+            if identity[0] != name:
+                continue
+            if identity[3] < 0:
+                keys.append((dev_id, button, name))
+            else:
+                tiled.setdefault(dev_id, ([], True))[0].append(button)
+        seen: set[Animation] = set()
+        for (dev_id, button), anim in self._animations.items():
+            source = self._sources.get(anim)
+            if anim in seen or anim.cancelled or source is None or source[0] != name:
+                continue
+            seen.add(anim)
+            if source[1]:
+                tiled.setdefault(dev_id, ([], anim.loop))[0].extend(anim.buttons)
+            else:
+                animated.append((dev_id, button, anim.loop))
+
+        for exc in await self.set_many(keys):
+            if exc is not None:
+                logger.warning("repainting %s failed: %s", name, exc)
+        for dev_id, (buttons, loop) in tiled.items():
+            try:
+                await self.set_tiled(dev_id, name, loop, sorted(set(buttons)))
+            except Exception:
+                logger.exception("repainting tiled %s on %s failed", name, dev_id)
+        for dev_id, button, loop in animated:
             try:
-                await task
-            except asyncio.CancelledError:
-                pass
+                await self.animate(dev_id, button, asset=name, loop=loop)
             except Exception:
-                logger.exception("animation task crashed during cancel")
+                logger.exception("restarting %s on %s/%d failed", name, dev_id, button)
 
     async def set_brightness(self, device_id: str, value: int) -> None:
         d = self._device(device_id)
         d.set_brightness(value)
 
+    def stats(self, device_id: Optional[str] = None) -> list[dict]:
+        """Per-(device, button) write counters, optionally for one device."""
+        dropped = self._scheduler.dropped
+        keys = sorted(set(dropped) | set(self._skipped))
+        return [
+            {
+                "device_id": dev_id,
+                "button": button,
+                "dropped_frames": dropped[(dev_id, button)],
+                "skipped_writes": self._skipped[(dev_id, button)],
+            }
+            for dev_id, button in keys
+            if device_id is None or dev_id == device_id
+        ]
+
+    def _forget_device(self, device_id: str) -> None:
+        for table in (self._shown, self._skipped, self._claims, self._scheduler.dropped):
+            for k in [k for k in table if k[0] == device_id]:
+                del table[k]
+
     async def purge_device(self, device_id: str) -> None:
         keys = [k for k in self._animations if k[0] == device_id]
         for k in keys:
-            await self._cancel_animation(*k)
+            self._cancel_animation(*k)
+        self._forget_device(device_id)
         self.unregister_device(device_id)
@@ -0,0 +1,163 @@
+"""Byte-budgeted LRU cache for resized images and encoded frames."""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Iterable, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Below this fraction of MemAvailable/MemTotal the cache shrinks to
+# `_PRESSURE_SHARE` of its budget until pressure eases.
+_LOW_MEMORY_RATIO = 0.10
+_PRESSURE_SHARE = 4
+# /proc/meminfo is read at most this often.
+_PRESSURE_CHECK_S = 1.0
+
+
+def _nbytes(value: Any) -> int:
+    """Approximate resident size of a cached value."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def _available_ratio(meminfo: Path) -> Optional[float]:
+    """MemAvailable / MemTotal, or None where /proc/meminfo isn't readable."""
+    fields: dict[str, int] = {}
+    try:
+        with meminfo.open() as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("MemTotal", "MemAvailable"):
+                    fields[key] = int(rest.split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    if not fields.get("MemTotal") or "MemAvailable" not in fields:
+        return None
+    return fields["MemAvailable"] / fields["MemTotal"]
+
+
+class FrameCache:
+    """LRU mapping bounded by bytes; keys start with an owner (an asset digest).
+
+    Entries are evicted least-recently-used first once their total size
+    exceeds the budget. A secondary index from owner to keys makes
+    `invalidate(owner)` proportional to that owner's entries rather than the
+    whole cache. When the system is short on memory the effective budget
+    drops to a fraction of the configured one.
+
+    A hit is counted on every successful `get`; a miss whenever an entry had
+    to be computed and stored. Safe to use from the resize worker threads.
+    """
+
+    def __init__(
+        self, budget_bytes: int, meminfo: Path = Path("/proc/meminfo")
+    ) -> None:
+        self.budget_bytes = budget_bytes
+        self._meminfo = meminfo
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._by_owner: dict[Hashable, set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._limit = budget_bytes
+        self._checked_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.update([(key, value)])
+
+    def update(self, items: Iterable[tuple[Hashable, Any]]) -> None:
+        self._check_pressure()
+        with self._lock:
+            for key, value in items:
+                self._discard(key)
+                size = _nbytes(value)
+                self.misses += 1
+                if size > self._limit:
+                    continue  # would evict everything else for one entry
+                self._entries[key] = (value, size)
+                self._by_owner.setdefault(key[0], set()).add(key)
+                self._bytes += size
+            self._evict()
+
+    def invalidate(self, owner: Hashable) -> None:
+        """Drop every entry belonging to `owner`."""
+        with self._lock:
+            for key in self._by_owner.pop(owner, ()):
+                _, size = self._entries.pop(key)
+                self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget_bytes,
+                "effective_budget_bytes": self._limit,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+            self._unindex(key)
+
+    def _unindex(self, key: Hashable) -> None:
+        keys = self._by_owner.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_owner[key[0]]
+
+    def _evict(self) -> None:
+        while self._bytes > self._limit and self._entries:
+            key, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._unindex(key)
+            self.evictions += 1
+
+    def _check_pressure(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < _PRESSURE_CHECK_S:
+            return
+        self._checked_at = now
+        ratio = _available_ratio(self._meminfo)
+        limit = self.budget_bytes
+        if ratio is not None and ratio < _LOW_MEMORY_RATIO:
+            limit //= _PRESSURE_SHARE
+        if limit != self._limit:
+            logger.info("frame cache budget now %d bytes (memory available: %s)",
+                        limit, "low" if limit < self.budget_bytes else "ok")
+            with self._lock:
+                self._limit = limit
+                self._evict()
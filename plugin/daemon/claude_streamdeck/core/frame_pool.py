@@ -0,0 +1,95 @@
+"""Optional process pool that decodes, resizes and encodes animation frames."""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Picklable image -> device-native bytes function (see Device.key_encoder).
+Encoder = Callable[[Image.Image], bytes]
+
+
+def _decode_frames(img: Image.Image, start: int, stop: int) -> list[bytes]:
+    """Frames [start, stop) of an open image as full-size RGB bytes.
+
+    Called with consecutive ranges, so every seek moves one frame forward.
+    """
+    out: list[bytes] = []
+    for i in range(start, stop):
+        img.seek(i)
+        out.append(img.convert("RGB").tobytes())
+    return out
+
+
+def _prepare_range(
+    frames: list[bytes],
+    source_size: tuple[int, int],
+    size: tuple[int, int],
+    encoder: Optional[Encoder],
+) -> list[bytes]:
+    """Worker: decoded RGB frames resized and encoded.
+
+    Without an encoder, frames come back as raw RGB bytes for the parent to
+    encode.
+    """
+    out: list[bytes] = []
+    for rgb in frames:
+        frame = Image.frombytes("RGB", source_size, rgb).resize(
+            size, Image.Resampling.LANCZOS
+        )
+        out.append(encoder(frame) if encoder is not None else frame.tobytes())
+    return out
+
+
+class FramePool:
+    """Resizes and encodes an animated asset's frames across worker processes.
+
+    Workers are spawned (not forked, the daemon runs HID threads) on first
+    use. GIF frames are composited onto the previous one, so seeking to
+    frame n decodes every frame before it; the source is therefore decoded
+    once, sequentially, on a thread here, and each batch of decoded frames
+    goes to a worker while the next batch is decoded. Workers do the
+    resizing and encoding, which dominate, and send back encoded frames.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def prepare(
+        self,
+        raw: bytes,
+        frame_count: int,
+        size: tuple[int, int],
+        encoder: Optional[Encoder],
+    ) -> list[bytes]:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        loop = asyncio.get_running_loop()
+        # Twice as many batches as workers keeps them busy while decoding.
+        step = -(-frame_count // (self.workers * 2))
+        jobs: list[asyncio.Future] = []
+        with Image.open(io.BytesIO(raw)) as img:
+            for start in range(0, frame_count, step):
+                frames = await loop.run_in_executor(
+                    None, _decode_frames, img, start, min(start + step, frame_count)
+                )
+                jobs.append(loop.run_in_executor(
+                    self._executor, _prepare_range, frames, img.size, size, encoder
+                ))
+        chunks = await asyncio.gather(*jobs)
+        return [data for chunk in chunks for data in chunk]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
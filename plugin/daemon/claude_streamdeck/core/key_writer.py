@@ -0,0 +1,84 @@
+"""Background HID writer: one thread per device, latest-wins per slot."""
+
+import logging
+import threading
+from typing import Callable, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+Write = Callable[[], None]
+
+
+class KeyWriter:
+    """Runs blocking device writes on a dedicated thread.
+
+    Pending writes are held per slot (a button index, or a name such as
+    "brightness"). Submitting to a slot whose previous write hasn't started
+    yet replaces it, so a key updated three times during one USB transfer
+    only sends its latest image. Slots are served in submission order.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._pending: dict[Hashable, Write] = {}
+        self._inflight: Optional[Hashable] = None
+        self._cond = threading.Condition()
+        self._stopping = False
+        self.coalesced = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, slot: Hashable, write: Write) -> None:
+        self.submit_many([(slot, write)])
+
+    def submit_many(self, writes: Iterable[tuple[Hashable, Write]]) -> None:
+        """Queue several writes under a single lock acquisition."""
+        with self._cond:
+            if self._stopping:
+                logger.debug("KeyWriter closed; dropping writes")
+                return
+            for slot, write in writes:
+                if slot in self._pending:
+                    self.coalesced += 1
+                self._pending[slot] = write
+            self._cond.notify()
+
+    def is_pending(self, slot: Hashable) -> bool:
+        """True if a write for `slot` is queued and hasn't started yet."""
+        with self._cond:
+            return slot in self._pending
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued write has completed. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and self._inflight is None, timeout
+            )
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Drain queued writes, then stop the thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("KeyWriter %s did not drain in %.1fs",
+                           self._thread.name, timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return  # stopping and drained
+                slot = next(iter(self._pending))
+                write = self._pending.pop(slot)
+                self._inflight = slot
+            try:
+                write()
+            except Exception:
+                logger.exception("HID write failed for slot %r", slot)
+            finally:
+                with self._cond:
+                    self._inflight = None
+                    self._cond.notify_all()
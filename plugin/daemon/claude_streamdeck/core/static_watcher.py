@@ -0,0 +1,170 @@
+"""Watches the static assets dir: inotify where available, mtime polling otherwise."""
+
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+OnChange = Callable[[set[Path]], Awaitable[None]]
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then the name
+
+
+def _inotify_fd(directory: Path) -> Optional[int]:
+    """A non-blocking inotify fd watching `directory`, or None if unsupported."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        init1 = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    fd = init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if fd < 0:
+        return None
+    if add_watch(fd, os.fsencode(directory), _WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _snapshot(directory: Path) -> dict[str, tuple[int, int]]:
+    out: dict[str, tuple[int, int]] = {}
+    try:
+        with os.scandir(directory) as it:
+            for e in it:
+                try:
+                    if e.is_file():
+                        st = e.stat()
+                        out[e.name] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return out
+
+
+class StaticWatcher:
+    """Reports files added, changed or removed in `directory`.
+
+    With inotify the fd is read from the event loop; otherwise the directory
+    is rescanned every `poll_interval` seconds and compared by mtime and
+    size. Changes are collected for `debounce` seconds (editors tend to write
+    a file in several steps) and handed to `on_change` as one set of paths.
+    If the kernel's inotify queue overflows and events are lost, the
+    directory is rescanned and every file that differs from the previous
+    scan is reported.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        on_change: OnChange,
+        poll_interval: float = 2.0,
+        debounce: float = 0.1,
+        use_inotify: bool = True,
+    ) -> None:
+        self.directory = directory
+        self.mode: Optional[str] = None
+        self._on_change = on_change
+        self._poll_interval = poll_interval
+        self._debounce = debounce
+        self._use_inotify = use_inotify
+        self._fd: Optional[int] = None
+        self._poller: Optional[asyncio.Task] = None
+        # Last full scan; the poller's baseline, and inotify's after an overflow.
+        self._seen: dict[str, tuple[int, int]] = {}
+        self._pending: set[Path] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._use_inotify:
+            self._fd = _inotify_fd(self.directory)
+        if self._fd is not None:
+            self._seen = _snapshot(self.directory)
+            loop.add_reader(self._fd, self._read_events)
+            self.mode = "inotify"
+        else:
+            self._poller = asyncio.create_task(self._poll())
+            self.mode = "poll"
+        logger.info("watching %s (%s)", self.directory, self.mode)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            asyncio.get_running_loop().remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for t in self._tasks:
+            t.cancel()
+
+    def _read_events(self) -> None:
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        off = 0
+        while off + _EVENT.size <= len(buf):
+            _, mask, _, length = _EVENT.unpack_from(buf, off)
+            raw = buf[off + _EVENT.size:off + _EVENT.size + length].rstrip(b"\0")
+            off += _EVENT.size + length
+            if mask & _IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflowed, rescanning %s",
+                               self.directory)
+                self._rescan()
+            elif raw:
+                self._changed(self.directory / os.fsdecode(raw))
+
+    async def _poll(self) -> None:
+        self._seen = _snapshot(self.directory)
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            self._rescan()
+
+    def _rescan(self) -> None:
+        now = _snapshot(self.directory)
+        for name in self._seen.keys() | now.keys():
+            if self._seen.get(name) != now.get(name):
+                self._changed(self.directory / name)
+        self._seen = now
+
+    def _changed(self, path: Path) -> None:
+        self._pending.add(path)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self._debounce, self._flush
+            )
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        paths, self._pending = self._pending, set()
+        task = asyncio.create_task(self._on_change(paths))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("static reload failed", exc_info=task.exception())
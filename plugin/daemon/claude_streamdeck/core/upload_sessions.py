@@ -0,0 +1,152 @@
+"""Chunked, resumable asset uploads: begin, append chunks, commit."""
+
+import base64
+import hashlib
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .asset_registry import AssetTooLargeError, InvalidAssetDataError
+from .command_registry import InvalidParamsError
+
+
+class UploadNotFoundError(Exception):
+    """Unknown upload id, or its session expired; the client starts over."""
+    error_code = "upload_not_found"
+
+
+class UploadLimitError(Exception):
+    """Too many open sessions, or too many bytes buffered across them."""
+    error_code = "upload_limit"
+
+
+@dataclass(eq=False)
+class UploadSession:
+    name: str
+    expected_size: Optional[int]
+    sha256: Optional[str]
+    buf: bytearray = field(default_factory=bytearray, repr=False)
+    touched: float = field(default_factory=time.monotonic)
+
+
+class UploadSessions:
+    """In-progress uploads, each assembled from base64 chunks.
+
+    Every chunk is decoded as it arrives, so no request carries more than
+    one chunk and other commands keep flowing between them. A chunk names
+    the byte offset it starts at; sending from any offset up to the bytes
+    received so far resumes an interrupted upload from the last
+    acknowledged chunk. Sessions idle for `ttl_s` are dropped.
+
+    At most `max_sessions` are open at once and together they buffer at
+    most `max_total_bytes` (default: four maximum-size assets); past either
+    limit `begin`/`append` raise `UploadLimitError` until uploads finish,
+    are aborted or expire.
+    """
+
+    def __init__(
+        self,
+        max_size_bytes: int,
+        ttl_s: float = 300.0,
+        max_sessions: int = 8,
+        max_total_bytes: Optional[int] = None,
+    ) -> None:
+        self._max_size = max_size_bytes
+        self._ttl = ttl_s
+        self._max_sessions = max_sessions
+        self._max_total = (
+            max_total_bytes if max_total_bytes is not None else 4 * max_size_bytes
+        )
+        self._sessions: dict[str, UploadSession] = {}
+        self._buffered = 0
+
+    def begin(
+        self, name: str, size: Optional[int] = None, sha256: Optional[str] = None
+    ) -> str:
+        self._expire()
+        if size is not None and size > self._max_size:
+            raise AssetTooLargeError(f"{size} > {self._max_size}")
+        if len(self._sessions) >= self._max_sessions:
+            raise UploadLimitError(f"{len(self._sessions)} uploads already open")
+        if size is not None and self._buffered + size > self._max_total:
+            raise UploadLimitError(
+                f"{self._buffered} bytes already buffered; {size} more exceeds "
+                f"{self._max_total}"
+            )
+        upload_id = secrets.token_hex(8)
+        self._sessions[upload_id] = UploadSession(
+            name=name, expected_size=size, sha256=sha256.lower() if sha256 else None
+        )
+        return upload_id
+
+    def append(self, upload_id: str, offset: int, data_b64: str) -> int:
+        """Store a chunk at `offset`; returns the bytes received so far."""
+        session = self._session(upload_id)
+        if offset < 0 or offset > len(session.buf):
+            raise InvalidParamsError(
+                f"offset {offset} past received {len(session.buf)}"
+            )
+        try:
+            chunk = base64.b64decode(data_b64, validate=True)
+        except Exception as e:
+            raise InvalidAssetDataError(f"base64 decode failed: {e}") from e
+        end = offset + len(chunk)
+        if end > self._max_size:
+            self._drop(upload_id)
+            raise AssetTooLargeError(f"{end} > {self._max_size}")
+        buffered = self._buffered - len(session.buf) + end
+        if buffered > self._max_total:
+            raise UploadLimitError(
+                f"{buffered} bytes buffered across uploads exceeds {self._max_total}"
+            )
+        del session.buf[offset:]
+        session.buf += chunk
+        self._buffered = buffered
+        return len(session.buf)
+
+    def status(self, upload_id: str) -> dict:
+        session = self._session(upload_id)
+        return {
+            "name": session.name,
+            "received": len(session.buf),
+            "size": session.expected_size,
+        }
+
+    def finish(self, upload_id: str) -> tuple[str, bytes]:
+        """Close the session and return (name, bytes), checking size and digest."""
+        session = self._session(upload_id)
+        raw = bytes(session.buf)
+        if session.expected_size is not None and len(raw) != session.expected_size:
+            raise InvalidAssetDataError(
+                f"received {len(raw)} of {session.expected_size} bytes"
+            )
+        if (
+            session.sha256 is not None
+            and hashlib.sha256(raw).hexdigest() != session.sha256
+        ):
+            self._drop(upload_id)
+            raise InvalidAssetDataError("sha256 mismatch")
+        self._drop(upload_id)
+        return session.name, raw
+
+    def abort(self, upload_id: str) -> None:
+        self._drop(upload_id)
+
+    def _drop(self, upload_id: str) -> None:
+        session = self._sessions.pop(upload_id, None)
+        if session is not None:
+            self._buffered -= len(session.buf)
+
+    def _session(self, upload_id: str) -> UploadSession:
+        self._expire()
+        session = self._sessions.get(upload_id)
+        if session is None:
+            raise UploadNotFoundError(upload_id)
+        session.touched = time.monotonic()
+        return session
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self._ttl
+        for upload_id in [u for u, s in self._sessions.items() if s.touched < cutoff]:
+            self._drop(upload_id)
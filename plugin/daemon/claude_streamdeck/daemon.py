@@ -2,6 +2,7 @@
 
 import asyncio
 import logging
+from pathlib import Path
 from typing import Optional
 
 from .config import DaemonConfig
@@ -10,23 +11,41 @@ from .core.command_registry import CommandRegistry
 from .core.core_api import CoreAPI
 from .core.device import Device
 from .core.device_manager import DeviceManager
+from .core.disk_cache import DiskCache
 from .core.display_engine import DisplayEngine
 from .core.event_bus import EventBus
 from .core.input_dispatcher import InputDispatcher
+from .core.static_watcher import StaticWatcher
 from .extensions import load_extensions, shutdown_extensions
 from .handlers import register_core_handlers
+from .transport.codec import get_codec
 from .transport.socket_server import SocketServer
 
 logger = logging.getLogger(__name__)
 
+# Expired disk cache entries are swept at least this often.
+_DISK_GC_INTERVAL_S = 3600.0
+
 
 class Daemon:
     def __init__(self, config: DaemonConfig) -> None:
         self.config = config
         self.bus = EventBus()
+        self.disk_cache: Optional[DiskCache] = None
+        if config.disk_cache_bytes > 0:
+            self.disk_cache = DiskCache(
+                config.cache_dir,
+                max_bytes=config.disk_cache_bytes,
+                max_age_s=config.disk_cache_max_age_days * 86400,
+            )
         self.assets = AssetRegistry(
             static_dir=config.assets_dir if config.assets_dir.exists() else None,
             max_size_bytes=config.max_asset_bytes,
+            prepare_workers=config.prepare_workers,
+            resize_workers=config.resize_workers,
+            frame_window=config.frame_window,
+            cache_bytes=config.cache_bytes,
+            disk_cache=self.disk_cache,
         )
         self.devices = DeviceManager()
         self.display = DisplayEngine(self.assets)
@@ -39,9 +58,16 @@ class Daemon:
         self.server = SocketServer(
             socket_path=config.socket_path,
             commands=self.commands, events=self.bus,
+            max_line_bytes=config.max_line_bytes,
+            outbound_queue=config.outbound_queue,
+            slow_consumer_policy=config.slow_consumer_policy,
+            codec=get_codec(config.json_codec),
         )
         self._running = False
         self._reconnect_task: Optional[asyncio.Task] = None
+        self._warm_task: Optional[asyncio.Task] = None
+        self._gc_task: Optional[asyncio.Task] = None
+        self._watcher: Optional[StaticWatcher] = None
 
     async def start(self) -> None:
         loop = asyncio.get_running_loop()
@@ -53,9 +79,25 @@ class Daemon:
         await self.server.start()
         self._running = True
         self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+        if self.config.warm_static_assets:
+            self._warm_task = asyncio.create_task(self.assets.warm_static())
+        if self.config.watch_assets and self.config.assets_dir.is_dir():
+            self._watcher = StaticWatcher(
+                self.config.assets_dir, self._reload_static,
+                poll_interval=self.config.watch_poll_interval_s,
+            )
+            self._watcher.start()
+        if self.disk_cache is not None:
+            self._gc_task = asyncio.create_task(self._disk_gc_loop())
 
     async def stop(self) -> None:
         self._running = False
+        if self._watcher:
+            self._watcher.close()
+        if self._warm_task:
+            self._warm_task.cancel()
+        if self._gc_task:
+            self._gc_task.cancel()
         if self._reconnect_task:
             self._reconnect_task.cancel()
             try:
@@ -64,6 +106,7 @@ class Daemon:
                 pass
         await self.server.stop()
         shutdown_extensions()
+        self.assets.close()
         for d in self.devices.all():
             try:
                 await self.display.purge_device(d.id)
@@ -72,6 +115,11 @@ class Daemon:
             except Exception:
                 logger.exception("device shutdown failed: %s", d.id)
 
+    async def _reload_static(self, paths: set[Path]) -> None:
+        for path in sorted(paths):
+            if self.assets.reload_static(path):
+                await self.display.refresh_asset(path.stem)
+
     async def _connect_devices(self) -> None:
         for d in self.devices.enumerate():
             self._wire_device(d)
@@ -91,6 +139,17 @@ class Daemon:
                              {"device_id": device.id, "model": device.model.value})
         )
 
+    async def _disk_gc_loop(self) -> None:
+        # Writes trigger their own passes once enough bytes pile up; this
+        # sweep also expires entries on a daemon that has stopped writing.
+        loop = asyncio.get_running_loop()
+        while self._running:
+            try:
+                await loop.run_in_executor(None, self.disk_cache.gc)
+            except Exception:
+                logger.exception("disk cache gc failed")
+            await asyncio.sleep(_DISK_GC_INTERVAL_S)
+
     async def _reconnect_loop(self) -> None:
         while self._running:
             await asyncio.sleep(2.0)
@@ -1,15 +1,88 @@
-"""asset.* handlers: upload, remove, list."""
+"""asset.* handlers: upload, chunked upload_*, ensure, remove, list, cache_stats."""
 
+import re
+from pathlib import Path
+
+from ..core.command_registry import InvalidParamsError
 from ..core.core_api import CoreAPI
+from ..core.upload_sessions import UploadSessions
+
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+_SHM_DIR = Path("/dev/shm")
 
 
 def register(api: CoreAPI) -> None:
+    uploads = UploadSessions(api.assets.max_size_bytes)
+
     async def upload(params):
+        """Upload base64 `data`, an absolute file `path`, or a POSIX `shm` name."""
         name = params["name"]
-        data = params["data"]
-        a = api.assets.upload(name, data)
+        sources = [k for k in ("data", "path", "shm") if k in params]
+        if len(sources) != 1:
+            raise InvalidParamsError(
+                "asset.upload needs exactly one of data, path, shm"
+            )
+        if "data" in params:
+            a = api.assets.upload(name, params["data"])
+        elif "path" in params:
+            path = Path(params["path"])
+            # Relative paths would resolve against the daemon's cwd, not the client's.
+            if not path.is_absolute():
+                raise InvalidParamsError(f"path must be absolute: {params['path']!r}")
+            a = api.assets.upload_file(name, path)
+        else:
+            shm = str(params["shm"]).lstrip("/")
+            if not shm or "/" in shm:
+                raise InvalidParamsError(f"invalid shm name: {params['shm']!r}")
+            a = api.assets.upload_file(name, _SHM_DIR / shm)
+        return {"name": a.name, "animated": a.animated, "frame_count": a.frame_count}
+
+    async def upload_begin(params):
+        size = params.get("size")
+        upload_id = uploads.begin(
+            params["name"],
+            size=None if size is None else int(size),
+            sha256=params.get("sha256"),
+        )
+        return {"upload_id": upload_id}
+
+    async def upload_chunk(params):
+        received = uploads.append(
+            params["upload_id"], int(params["offset"]), params["data"]
+        )
+        return {"received": received}
+
+    async def upload_status(params):
+        return uploads.status(params["upload_id"])
+
+    async def upload_commit(params):
+        name, raw = uploads.finish(params["upload_id"])
+        a = api.assets.upload_bytes(name, raw)
         return {"name": a.name, "animated": a.animated, "frame_count": a.frame_count}
 
+    async def upload_abort(params):
+        uploads.abort(params["upload_id"])
+        return {}
+
+    async def ensure(params):
+        """Bind names to content the daemon already has; report the rest."""
+        bound: list[str] = []
+        missing: list[str] = []
+        # Validate every entry first so a bad one doesn't leave the call
+        # half-applied.
+        wanted: list[tuple[str, str]] = []
+        for entry in params["assets"]:
+            name, digest = entry["name"], str(entry["sha256"]).lower()
+            if not _SHA256.fullmatch(digest):
+                raise InvalidParamsError(f"invalid sha256 for {name!r}")
+            wanted.append((name, digest))
+        for name, digest in wanted:
+            if api.assets.bind(name, digest) is not None:
+                bound.append(name)
+            elif digest not in missing:
+                missing.append(digest)
+        return {"bound": bound, "missing": missing}
+
     async def remove(params):
         api.assets.remove(params["name"])
         return {}
@@ -17,6 +90,16 @@ def register(api: CoreAPI) -> None:
     async def list_assets(_params):
         return api.assets.list()
 
+    async def cache_stats(_params):
+        return api.assets.cache_stats()
+
     api.commands.register("asset.upload", upload)
+    api.commands.register("asset.upload_begin", upload_begin)
+    api.commands.register("asset.upload_chunk", upload_chunk)
+    api.commands.register("asset.upload_status", upload_status)
+    api.commands.register("asset.upload_commit", upload_commit)
+    api.commands.register("asset.upload_abort", upload_abort)
+    api.commands.register("asset.ensure", ensure)
     api.commands.register("asset.remove", remove)
     api.commands.register("asset.list", list_assets)
+    api.commands.register("asset.cache_stats", cache_stats)
@@ -1,6 +1,12 @@
 """device.* handlers: list, capabilities."""
 
 from ..core.core_api import CoreAPI
+from ..core.display_engine import DeviceNotFoundError
+
+
+class NoDeviceError(RuntimeError):
+    """A command omitted `device_id` and no device is connected."""
+    error_code = "no_device"
 
 
 def _device_dict(d) -> dict:
@@ -8,6 +14,7 @@ def _device_dict(d) -> dict:
         "id": d.id,
         "model": d.model.value,
         "key_count": d.key_count,
+        "key_layout": list(d.key_layout),
         "image_size": list(d.image_size),
         "image_format": d.image_format.value,
         "has_screen": d.has_screen,
@@ -22,7 +29,9 @@ def _resolve_device(api: CoreAPI, params: dict):
     else:
         d = api.devices.get(device_id)
     if d is None:
-        raise RuntimeError("no_device" if device_id is None else "device_not_found")
+        if device_id is None:
+            raise NoDeviceError("no_device")
+        raise DeviceNotFoundError(device_id)
     return d
 
 
@@ -1,15 +1,59 @@
-"""display.* handlers: set, clear, animate, stop_animation, brightness."""
+"""display.* handlers: set, set_many, tile, clear, animate, animate_group,
+stop_animation, brightness, stats."""
+
+from typing import Optional
 
 from ..core.core_api import CoreAPI
 from .device_handlers import _resolve_device
 
 
+def _entry_status(exc) -> dict:
+    """Per-entry result for batch commands, using protocol error codes.
+
+    Codes come from the exception's `error_code`, as for single commands;
+    malformed entries without one are reported as invalid_params.
+    """
+    if exc is None:
+        return {"ok": True}
+    code = getattr(exc, "error_code", None)
+    if code is None:
+        if isinstance(exc, (KeyError, TypeError, ValueError)):
+            code = "invalid_params"
+        else:
+            code = "extension_error"
+    return {"ok": False, "error": code, "message": str(exc)}
+
+
 def register(api: CoreAPI) -> None:
     async def set_image(params):
         d = _resolve_device(api, params)
         await api.display.set_image(d.id, params["button"], params["asset"])
         return {}
 
+    async def set_many(params):
+        entries = params["entries"]
+        statuses: list[Optional[dict]] = [None] * len(entries)
+        batch: list[tuple[str, int, Optional[str]]] = []
+        slots: list[int] = []
+        for i, e in enumerate(entries):
+            try:
+                d = _resolve_device(api, e)
+                asset = None if e.get("clear") else e["asset"]
+                batch.append((d.id, int(e["button"]), asset))
+                slots.append(i)
+            except Exception as exc:
+                statuses[i] = _entry_status(exc)
+        for i, exc in zip(slots, await api.display.set_many(batch)):
+            statuses[i] = _entry_status(exc)
+        return {"results": statuses}
+
+    async def tile(params):
+        d = _resolve_device(api, params)
+        await api.display.set_tiled(
+            d.id, params["asset"], loop=bool(params.get("loop", True))
+        )
+        return {}
+
     async def clear(params):
         d = _resolve_device(api, params)
         await api.display.clear(d.id, params["button"])
@@ -26,6 +70,16 @@ def register(api: CoreAPI) -> None:
         )
         return {}
 
+    async def animate_group(params):
+        d = _resolve_device(api, params)
+        await api.display.animate_group(
+            d.id,
+            [int(b) for b in params["buttons"]],
+            frames=params["frames"],
+            loop=bool(params.get("loop", True)),
+        )
+        return {}
+
     async def stop_animation(params):
         d = _resolve_device(api, params)
         await api.display.stop_animation(
@@ -38,8 +92,18 @@ def register(api: CoreAPI) -> None:
         await api.display.set_brightness(d.id, int(params["value"]))
         return {}
 
+    async def stats(params):
+        device_id = None
+        if params.get("device_id") is not None:
+            device_id = _resolve_device(api, params).id
+        return {"buttons": api.display.stats(device_id)}
+
     api.commands.register("display.set", set_image)
+    api.commands.register("display.set_many", set_many)
+    api.commands.register("display.tile", tile)
     api.commands.register("display.clear", clear)
     api.commands.register("display.animate", animate)
+    api.commands.register("display.animate_group", animate_group)
     api.commands.register("display.stop_animation", stop_animation)
     api.commands.register("display.brightness", brightness)
+    api.commands.register("display.stats", stats)
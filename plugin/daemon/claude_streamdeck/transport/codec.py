@@ -0,0 +1,78 @@
+"""JSON codecs for the socket protocol: stdlib, or orjson when installed."""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+# Encoding always goes through the stdlib encoder: clients see `json.dumps`
+# output (", " / ": " separators, ASCII escapes), which orjson can't produce.
+_ENCODER = json.JSONEncoder()
+
+# orjson reads integers outside int64/uint64 as floats instead of failing,
+# so a float this large may have been one.
+_INT64_LIMIT = float(2**63)
+
+
+def _has_huge_float(obj: Any) -> bool:
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if isinstance(o, dict):
+            stack.extend(o.values())
+        elif isinstance(o, list):
+            stack.extend(o)
+        elif isinstance(o, float) and abs(o) >= _INT64_LIMIT:
+            return True
+    return False
+
+
+class JSONCodec:
+    """Turns protocol lines into objects and back, using only stdlib `json`."""
+
+    name = "json"
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+    def dumps_line(self, obj: Any) -> bytes:
+        """`obj` as one newline-terminated line, byte for byte `json.dumps`."""
+        # ensure_ascii output is pure ASCII, so this equals .encode("utf-8").
+        return (_ENCODER.encode(obj) + "\n").encode("ascii")
+
+
+class OrjsonCodec(JSONCodec):
+    """Decodes with orjson; lines it rejects are retried with stdlib `json`.
+
+    orjson is stricter (no NaN/Infinity or lone surrogates) and reads
+    integers past 64 bits as floats; lines hitting either are decoded again
+    by stdlib, so every line yields exactly what `json.loads` returns.
+    """
+
+    name = "orjson"
+
+    def loads(self, data: bytes) -> Any:
+        try:
+            obj = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+        return json.loads(data) if _has_huge_float(obj) else obj
+
+
+def get_codec(name: str = "auto") -> JSONCodec:
+    """Codec by name; "auto" is orjson when it's importable, else stdlib."""
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name == "json":
+        return JSONCodec()
+    if name == "orjson":
+        if orjson is None:
+            raise ValueError("json codec 'orjson' requested but orjson isn't installed")
+        return OrjsonCodec()
+    raise ValueError(f"unknown json codec: {name!r}")
+
+
+DEFAULT_CODEC = get_codec()
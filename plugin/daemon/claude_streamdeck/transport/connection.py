@@ -1,10 +1,24 @@
-"""Per-client connection: JSONL framing, response/event helpers, subscriptions."""
+"""Per-client connection: JSONL framing, outbound queue, subscriptions."""
 
 import asyncio
-import json
+import itertools
+import logging
 import time
+from collections import deque
 from dataclasses import dataclass
-from typing import Any, AsyncIterator, Optional
+from typing import Any, AsyncIterator, Hashable, Optional, Union
+
+from .codec import DEFAULT_CODEC, JSONCodec
+
+logger = logging.getLogger(__name__)
+
+# Default cap on one JSONL line; the daemon derives its own from the config.
+DEFAULT_MAX_LINE_BYTES = 8 * 1024 * 1024
+_READ_CHUNK = 256 * 1024
+
+DEFAULT_OUTBOUND_QUEUE = 256
+# What to do with an event when a client's outbound queue is full.
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "coalesce", "disconnect")
 
 
 @dataclass
@@ -13,26 +27,122 @@ class InvalidJSONLine:
     line: bytes
 
 
+@dataclass
+class OversizedLine:
+    """Sentinel yielded in place of a line longer than the connection's cap."""
+    size: int
+
+
+def encode_event(
+    name: str, payload: dict[str, Any], codec: JSONCodec = DEFAULT_CODEC
+) -> bytes:
+    """One event as a JSONL line, stamped with the current time."""
+    obj: dict[str, Any] = {"event": name, "ts": int(time.time() * 1000)}
+    obj.update(payload)
+    return codec.dumps_line(obj)
+
+
+def event_key(name: str, payload: dict[str, Any]) -> Hashable:
+    """Events with equal keys supersede each other under the coalesce policy."""
+    return (name, payload.get("device_id"), payload.get("button"))
+
+
+@dataclass(eq=False)
+class _Outbound:
+    line: bytes
+    key: Optional[Hashable] = None  # events with the same key coalesce
+    done: Optional[asyncio.Future] = None  # set for responses; never dropped
+
+
 class Connection:
-    """Wraps a StreamReader/StreamWriter pair with JSONL framing helpers."""
+    """Wraps a StreamReader/StreamWriter pair with JSONL framing helpers.
+
+    Lines are framed here rather than with `StreamReader.readline()`, whose
+    64 KiB default limit is far below a base64 asset. Incoming chunks are
+    collected in a list and joined once per line, so long lines cost linear
+    time. A line past `max_line_bytes` is skipped up to its newline and
+    reported as `OversizedLine`, leaving the connection usable.
 
-    def __init__(self, reader, writer) -> None:
+    Outgoing lines go through a bounded queue drained by a per-connection
+    writer task, so a client that stops reading only stalls itself.
+    Responses wait for their own write and are never dropped; events are
+    queued without waiting. When `max_queue` lines are pending, `policy`
+    decides: "drop_oldest" discards the oldest queued event, "coalesce"
+    discards an older copy of the same event for the same button or device
+    (else the oldest) so the newest state still arrives, and "disconnect"
+    closes the connection.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        reader,
+        writer,
+        max_line_bytes: int = DEFAULT_MAX_LINE_BYTES,
+        max_queue: int = DEFAULT_OUTBOUND_QUEUE,
+        policy: str = "drop_oldest",
+        codec: JSONCodec = DEFAULT_CODEC,
+    ) -> None:
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"unknown slow consumer policy: {policy!r}")
+        self.id = next(Connection._ids)
         self._reader = reader
         self._writer = writer
+        self._codec = codec
+        self.max_line_bytes = max_line_bytes
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
         self.subscriptions: set[str] = set()
-        self._send_lock = asyncio.Lock()
+        self.dropped = 0
+        self.coalesced = 0
+        self.peak_depth = 0
+        self.disconnected = False  # closed by the "disconnect" policy
+        self._queue: deque[_Outbound] = deque()
+        self._wakeup = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+        self._batch: list[_Outbound] = []  # taken off the queue, being written
+        self._closing = False
 
-    async def iter_messages(self) -> AsyncIterator[Any]:
+    async def _lines(self) -> AsyncIterator[Union[bytes, OversizedLine]]:
+        pieces: list[bytes] = []
+        size = 0
         while True:
-            line = await self._reader.readline()
-            if not line:
+            chunk = await self._reader.read(_READ_CHUNK)
+            if not chunk:
+                # Like readline(), a final unterminated line still counts.
+                if size > self.max_line_bytes:
+                    yield OversizedLine(size)
+                elif pieces:
+                    yield b"".join(pieces)
                 return
+            start = 0
+            while True:
+                nl = chunk.find(b"\n", start)
+                end = len(chunk) if nl < 0 else nl
+                size += end - start
+                if size <= self.max_line_bytes:
+                    pieces.append(chunk[start:end])
+                else:
+                    pieces.clear()  # over the cap: discard up to the newline
+                if nl < 0:
+                    break
+                yield OversizedLine(size) if size > self.max_line_bytes else b"".join(pieces)
+                pieces = []
+                size = 0
+                start = nl + 1
+
+    async def iter_messages(self) -> AsyncIterator[Any]:
+        async for line in self._lines():
+            if isinstance(line, OversizedLine):
+                yield line
+                continue
             text = line.strip()
             if not text:
                 continue
             try:
-                yield json.loads(text)
-            except json.JSONDecodeError:
+                yield self._codec.loads(text)
+            except ValueError:  # JSONDecodeError, or bytes that aren't UTF-8
                 yield InvalidJSONLine(line=line)
 
     async def send_response(
@@ -54,20 +164,115 @@ class Connection:
                 obj["error"] = error
             if message is not None:
                 obj["message"] = message
-        await self._write_json(obj)
+        await self._send_and_wait(self._codec.dumps_line(obj))
 
     async def send_event(self, name: str, payload: dict[str, Any]) -> None:
-        obj: dict[str, Any] = {"event": name, "ts": int(time.time() * 1000)}
-        obj.update(payload)
-        await self._write_json(obj)
+        """Queue an event; returns without waiting for the client to read it."""
+        self.send_line(encode_event(name, payload, self._codec), event_key(name, payload))
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far has been written."""
+        await self._send_and_wait(b"")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "subscriptions": sorted(self.subscriptions),
+            "queued": len(self._queue),
+            "peak_queued": self.peak_depth,
+            "max_queue": self.max_queue,
+            "policy": self.policy,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+    async def _send_and_wait(self, line: bytes) -> None:
+        if self._closing:
+            return
+        done = asyncio.get_running_loop().create_future()
+        self._queue.append(_Outbound(line, done=done))
+        self._kick()
+        await done
+
+    def send_line(self, line: bytes, key: Hashable = None) -> None:
+        """Queue an already encoded event line, shared as-is between connections."""
+        if self._closing:
+            return
+        queue = self._queue
+        if len(queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                logger.warning("connection %d: outbound queue full, disconnecting", self.id)
+                self.dropped += 1
+                self.disconnected = True
+                self._abort()
+                return
+            stale = None
+            if self.policy == "coalesce":
+                stale = next((item for item in queue if item.key == key), None)
+            if stale is not None:
+                self.coalesced += 1
+            else:
+                stale = next((item for item in queue if item.done is None), None)
+                self.dropped += 1
+                if stale is None:
+                    return  # only responses queued; drop the new event instead
+            queue.remove(stale)
+        queue.append(_Outbound(line, key=key))
+        self.peak_depth = max(self.peak_depth, len(queue))
+        self._kick()
 
-    async def _write_json(self, obj: dict[str, Any]) -> None:
-        line = (json.dumps(obj) + "\n").encode("utf-8")
-        async with self._send_lock:
-            self._writer.write(line)
-            await self._writer.drain()
+    def _kick(self) -> None:
+        if self._writer_task is None:
+            self._writer_task = asyncio.get_running_loop().create_task(self._drain_queue())
+        self._wakeup.set()
+
+    async def _drain_queue(self) -> None:
+        queue = self._queue
+        while True:
+            if not queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            # Write everything queued, then drain once for the batch.
+            batch = self._batch = list(queue)
+            queue.clear()
+            try:
+                for item in batch:
+                    if item.line:
+                        self._writer.write(item.line)
+                await self._writer.drain()
+            except Exception as e:
+                self._closing = True
+                self._fail_pending(str(e))
+                return
+            self._batch = []
+            for item in batch:
+                if item.done is not None and not item.done.done():
+                    item.done.set_result(None)
+
+    def _fail_pending(self, reason: str) -> None:
+        """Fail every response still waiting, queued or mid-write."""
+        for item in self._batch + list(self._queue):
+            if item.done is not None and not item.done.done():
+                item.done.set_exception(ConnectionResetError(reason))
+        self._batch = []
+        self._queue.clear()
+
+    def _abort(self) -> None:
+        self._closing = True
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+        self._fail_pending("disconnected: outbound queue full")
+        if not self._writer.is_closing():
+            self._writer.close()
 
     async def close(self) -> None:
+        self._closing = True
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            await asyncio.wait([self._writer_task])
+            self._writer_task = None
+        self._fail_pending("connection closed")
         if not self._writer.is_closing():
             self._writer.close()
             try:
@@ -11,7 +11,17 @@ from ..core.command_registry import (
     UnknownCommandError,
 )
 from ..core.event_bus import EventBus
-from .connection import Connection, InvalidJSONLine
+from .codec import DEFAULT_CODEC, JSONCodec
+from .connection import (
+    DEFAULT_MAX_LINE_BYTES,
+    DEFAULT_OUTBOUND_QUEUE,
+    SLOW_CONSUMER_POLICIES,
+    Connection,
+    InvalidJSONLine,
+    OversizedLine,
+    encode_event,
+    event_key,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,14 +34,25 @@ class SocketServer:
         socket_path: Path,
         commands: CommandRegistry,
         events: EventBus,
+        max_line_bytes: int = DEFAULT_MAX_LINE_BYTES,
+        outbound_queue: int = DEFAULT_OUTBOUND_QUEUE,
+        slow_consumer_policy: str = "drop_oldest",
+        codec: JSONCodec = DEFAULT_CODEC,
     ) -> None:
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"unknown slow consumer policy: {slow_consumer_policy!r}")
         self.socket_path = socket_path
+        self.max_line_bytes = max_line_bytes
+        self.outbound_queue = outbound_queue
+        self.slow_consumer_policy = slow_consumer_policy
+        self.codec = codec
         self._commands = commands
         self._events = events
         self._server: Optional[asyncio.AbstractServer] = None
         self._connections: set[Connection] = set()
-        # Built-in handlers for input.subscribe / input.unsubscribe live here
-        # because they need access to the per-connection state.
+        # Built-in handlers for input.subscribe / input.unsubscribe and
+        # system.connections live here because they need the per-connection
+        # state.
         self._register_subscription_handlers()
         self._wire_event_broadcast()
 
@@ -60,11 +81,18 @@ class SocketServer:
         self._events.subscribe("device.disconnected", _on_dev_disc)
 
     async def _broadcast(self, name: str, payload: dict, gate: Optional[str]) -> None:
+        # Encoded once and queued on every subscriber as the same bytes; the
+        # queues are drained by each connection, so a slow client can't hold
+        # up the others.
+        line = key = None
         for conn in list(self._connections):
             if gate is not None and gate not in conn.subscriptions:
                 continue
             try:
-                await conn.send_event(name, payload)
+                if line is None:
+                    line = encode_event(name, payload, self.codec)
+                    key = event_key(name, payload)
+                conn.send_line(line, key)
             except Exception:
                 logger.exception("send_event failed on connection")
 
@@ -93,7 +121,11 @@ class SocketServer:
                 pass
 
     async def _handle_connection(self, reader, writer) -> None:
-        conn = Connection(reader, writer)
+        conn = Connection(
+            reader, writer, max_line_bytes=self.max_line_bytes,
+            max_queue=self.outbound_queue, policy=self.slow_consumer_policy,
+            codec=self.codec,
+        )
         self._connections.add(conn)
         try:
             async for msg in conn.iter_messages():
@@ -103,7 +135,16 @@ class SocketServer:
                         error="invalid_json", message="malformed JSON line",
                     )
                     continue
+                if isinstance(msg, OversizedLine):
+                    await conn.send_response(
+                        request_id=None, ok=False, error="line_too_long",
+                        message=f"line of {msg.size} bytes exceeds "
+                                f"{conn.max_line_bytes}",
+                    )
+                    continue
                 await self._dispatch(conn, msg)
+        except ConnectionResetError:
+            logger.debug("connection %d reset", conn.id)
         except Exception:
             logger.exception("connection crashed")
         finally:
@@ -129,6 +170,15 @@ class SocketServer:
             conn.subscriptions.discard("input")
             await conn.send_response(request_id, ok=True, result={})
             return
+        if cmd == "system.connections":
+            result = {
+                "self": conn.id,
+                "connections": sorted(
+                    (c.stats() for c in self._connections), key=lambda s: s["id"]
+                ),
+            }
+            await conn.send_response(request_id, ok=True, result=result)
+            return
 
         params = {k: v for k, v in msg.items() if k not in ("cmd", "request_id")}
         try:
@@ -140,7 +190,10 @@ class SocketServer:
                 message=f"no such command: {cmd}",
             )
         except Exception as e:
-            logger.exception("handler failed: %s", cmd)
+            # Errors a client is expected to handle carry their own code.
+            code = getattr(e, "error_code", None)
+            if code is None:
+                logger.exception("handler failed: %s", cmd)
             await conn.send_response(
-                request_id, ok=False, error="extension_error", message=str(e),
+                request_id, ok=False, error=code or "extension_error", message=str(e),
             )
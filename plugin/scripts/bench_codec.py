@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Per-message JSON cost of the socket protocol, for each available codec.
+
+Run from the repo root:
+  PYTHONPATH=plugin/daemon python plugin/scripts/bench_codec.py [--upload-kib 256]
+
+Decoding is timed on request lines as the daemon receives them, encoding on
+the response and event lines it sends back (events via `encode_event`, as
+the broadcast path does). "stdlib" is plain json.loads / json.dumps.
+"""
+
+import argparse
+import base64
+import json
+import os
+import timeit
+
+from claude_streamdeck.transport import codec as codec_mod
+from claude_streamdeck.transport.connection import encode_event
+
+
+def _payloads(upload_kib: int) -> dict[str, tuple[bytes, object]]:
+    """name -> (line as received, object as sent)."""
+    display_set = {"cmd": "display.set", "request_id": "req-000042",
+                   "device_id": "xl-1", "button": 12, "asset": "claude.thinking"}
+    upload = {"cmd": "asset.upload", "request_id": "req-000043", "name": "spinner",
+              "data": base64.b64encode(os.urandom(upload_kib * 1024)).decode()}
+    response = {"ok": True, "request_id": "req-000042", "result": {}}
+    event = {"device_id": "xl-1", "button": 12}
+    return {
+        "display.set": (json.dumps(display_set).encode(), response),
+        f"asset.upload ({upload_kib} KiB)": (json.dumps(upload).encode(), response),
+        "button.pressed event": (None, event),
+    }
+
+
+def _per_call_us(fn, number: int) -> float:
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--upload-kib", type=int, default=256)
+    ap.add_argument("--number", type=int, default=20_000)
+    args = ap.parse_args()
+
+    codecs = [("json", codec_mod.JSONCodec())]
+    if codec_mod.orjson is not None:
+        codecs.append(("orjson", codec_mod.OrjsonCodec()))
+    else:
+        print("orjson not installed; only the stdlib codec is measured\n")
+
+    print(f"{'payload':<28}{'op':<8}{'stdlib':>10}" + "".join(f"{n:>10}" for n, _ in codecs))
+    for name, (line, obj) in _payloads(args.upload_kib).items():
+        n = args.number if "upload" not in name else max(1, args.number // 200)
+        if line is not None:
+            row = [_per_call_us(lambda: json.loads(line), n)]
+            row += [_per_call_us(lambda c=c: c.loads(line), n) for _, c in codecs]
+            print(f"{name:<28}{'decode':<8}" + "".join(f"{us:>8.2f}us" for us in row))
+        if "event" in name:
+            row = [_per_call_us(
+                lambda: (json.dumps({"event": "button.pressed", "ts": 0, **obj}) + "\n").encode(), n
+            )]
+            row += [_per_call_us(lambda c=c: encode_event("button.pressed", obj, c), n)
+                    for _, c in codecs]
+        else:
+            row = [_per_call_us(lambda: (json.dumps(obj) + "\n").encode(), n)]
+            row += [_per_call_us(lambda c=c: c.dumps_line(obj), n) for _, c in codecs]
+        print(f"{name:<28}{'encode':<8}" + "".join(f"{us:>8.2f}us" for us in row))
+
+
+if __name__ == "__main__":
+    main()
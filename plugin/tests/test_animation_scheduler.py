@@ -0,0 +1,126 @@
+"""Tests for the shared AnimationScheduler."""
+
+import asyncio
+import time
+
+import pytest
+
+from claude_streamdeck.core.animation_scheduler import Animation, AnimationScheduler
+from claude_streamdeck.core.device import DeviceModel, MockDevice
+
+
+def _dev():
+    return MockDevice(id="xl-1", model=DeviceModel.XL, key_count=32, image_size=(2, 2))
+
+
+def _seq(n=3, dur=20, keys=1):
+    return [((bytes([i]) * 12,) * keys, dur) for i in range(n)]
+
+
+async def test_first_frame_written_immediately():
+    dev = _dev()
+    sched = AnimationScheduler()
+    sched.add(Animation(device=dev, buttons=(4,), sequence=_seq(), loop=True))
+    assert len(dev.set_key_calls) == 1
+    sched.close()
+
+
+async def test_one_wakeup_serves_all_buttons():
+    dev = _dev()
+    sched = AnimationScheduler()
+    for b in range(32):
+        sched.add(Animation(device=dev, buttons=(b,), sequence=_seq(), loop=True))
+    await asyncio.sleep(0.2)
+    sched.close()
+    writes_per_key = len(dev.set_key_calls) / 32
+    assert writes_per_key >= 3
+    # One wakeup per tick, not one per button.
+    assert sched.wakeups <= writes_per_key + 1
+
+
+async def test_deadlines_do_not_drift():
+    dev = _dev()
+    sched = AnimationScheduler()
+    anim = Animation(device=dev, buttons=(0,), sequence=_seq(dur=10), loop=True)
+    sched.add(anim)
+    start = anim.deadline - 0.010
+    await asyncio.sleep(0.1)
+    sched.close()
+    ticks = (anim.deadline - start) / 0.010
+    assert ticks == pytest.approx(round(ticks))
+
+
+async def test_non_looping_animation_finishes():
+    dev = _dev()
+    sched = AnimationScheduler()
+    anim = Animation(device=dev, buttons=(0,), sequence=_seq(n=2, dur=10), loop=False)
+    sched.add(anim)
+    await asyncio.sleep(0.08)
+    assert len(dev.set_key_calls) == 2
+    assert anim.cancelled is True
+
+
+async def test_cancel_stops_writes():
+    dev = _dev()
+    sched = AnimationScheduler()
+    anim = Animation(device=dev, buttons=(0,), sequence=_seq(), loop=True)
+    sched.add(anim)
+    sched.cancel(anim)
+    await asyncio.sleep(0.06)
+    assert len(dev.set_key_calls) == 1
+
+
+async def test_lagging_scheduler_skips_frames_and_counts_drops():
+    dev = _dev()
+    sched = AnimationScheduler()
+    anim = Animation(device=dev, buttons=(2,), sequence=_seq(n=4, dur=10), loop=True)
+    sched.add(anim)
+    time.sleep(0.065)  # stall the loop for ~6 frame windows
+    await asyncio.sleep(0.005)
+    sched.close()
+    assert len(dev.set_key_calls) <= 3
+    assert sched.dropped[("xl-1", 2)] >= 4
+    # Still on schedule: the next deadline is in the future, not in the past.
+    assert anim.deadline > asyncio.get_running_loop().time() - 0.01
+
+
+async def test_superseding_unwritten_frame_counts_as_drop():
+    class SlowDevice(MockDevice):
+        def key_write_pending(self, button):
+            return True
+
+    dev = SlowDevice(id="slow", model=DeviceModel.XL, key_count=32, image_size=(2, 2))
+    sched = AnimationScheduler()
+    sched.add(Animation(device=dev, buttons=(0,), sequence=_seq(dur=10), loop=True))
+    await asyncio.sleep(0.05)
+    sched.close()
+    assert sched.dropped[("slow", 0)] >= 2
+
+
+async def test_group_advances_all_buttons_on_one_tick():
+    dev = _dev()
+    sched = AnimationScheduler()
+    anim = Animation(device=dev, buttons=(0, 1, 8, 9), sequence=_seq(keys=4), loop=True)
+    sched.add(anim)
+    await asyncio.sleep(0.1)
+    sched.close()
+    per_key = {b: [img.tobytes() for k, img in dev.set_key_calls if k == b]
+               for b in anim.buttons}
+    assert len(per_key[0]) >= 3
+    assert all(frames == per_key[0] for frames in per_key.values())
+
+
+async def test_incomplete_one_shot_holds_until_next_frame_arrives():
+    dev = _dev()
+    sched = AnimationScheduler()
+    seq = _seq(n=3, dur=10)
+    anim = Animation(device=dev, buttons=(0,), sequence=seq[:1], loop=False,
+                     complete=False)
+    sched.add(anim)
+    await asyncio.sleep(0.04)
+    assert len(dev.set_key_calls) == 1 and not anim.cancelled
+    anim.sequence.extend(seq[1:])
+    anim.complete = True
+    await asyncio.sleep(0.06)
+    assert len(dev.set_key_calls) == 3
+    assert anim.cancelled  # finished
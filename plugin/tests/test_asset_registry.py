@@ -1,5 +1,6 @@
 """Tests for AssetRegistry."""
 
+import asyncio
 import base64
 import io
 from pathlib import Path
@@ -13,7 +14,9 @@ from claude_streamdeck.core.asset_registry import (
     AssetRegistry,
     AssetTooLargeError,
     InvalidAssetDataError,
+    PackedFrame,
 )
+from claude_streamdeck.core.device import DeviceModel, MockDevice
 
 
 def _png_bytes(color=(255, 0, 0), size=(50, 50)) -> bytes:
@@ -121,3 +124,317 @@ def test_list_assets():
     items = reg.list()
     names = sorted(i["name"] for i in items)
     assert names == ["a", "b"]
+
+
+async def test_native_cache_encodes_each_frame_once():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    reg.upload("spin", base64.b64encode(_gif_bytes_animated(frames=3)).decode())
+    dev = MockDevice(id="m", model=DeviceModel.XL, key_count=32, image_size=(96, 96))
+    first = await reg.get_native_frames_async("spin", dev)
+    second = await reg.get_native_frames_async("spin", dev)
+    assert len(first) == 3
+    assert all(a is b for a, b in zip(first, second))
+    assert dev.encode_count == 3
+
+
+async def test_native_cache_invalidated_on_reupload():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    dev = MockDevice(id="m", model=DeviceModel.XL, key_count=32, image_size=(96, 96))
+    reg.upload("a", base64.b64encode(_png_bytes(color=(255, 0, 0))).decode())
+    red = await reg.get_native_async("a", dev)
+    reg.upload("a", base64.b64encode(_png_bytes(color=(0, 255, 0))).decode())
+    green = await reg.get_native_async("a", dev)
+    assert red != green
+    assert dev.encode_count == 2
+
+
+def _quadrants_png(size=(80, 40)) -> bytes:
+    """Left half red, right half blue."""
+    img = Image.new("RGB", size, (255, 0, 0))
+    img.paste((0, 0, 255), (size[0] // 2, 0, size[0], size[1]))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+async def test_tiles_follow_key_grid(monkeypatch, vectorized):
+    from claude_streamdeck.core import asset_registry
+    if not vectorized:
+        monkeypatch.setattr(asset_registry, "np", None)
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    reg.upload("wide", base64.b64encode(_quadrants_png()).decode())
+    dev = MockDevice(id="m", model=DeviceModel.XL, key_count=8, image_size=(20, 20),
+                     key_layout=(2, 4))
+    (tiles,) = await reg.get_native_tiles_async("wide", dev)
+    assert len(tiles) == 8
+    colors = [Image.frombytes("RGB", (20, 20), t).getpixel((10, 10)) for t in tiles]
+    assert colors == [(255, 0, 0)] * 2 + [(0, 0, 255)] * 2 + [(255, 0, 0)] * 2 + [(0, 0, 255)] * 2
+    assert (await reg.get_native_tiles_async("wide", dev))[0] is tiles
+
+
+async def test_native_tiles_encoded_once_per_geometry():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    reg.upload("spin", base64.b64encode(_gif_bytes_animated(frames=2)).decode())
+    dev = MockDevice(id="m", model=DeviceModel.XL, key_count=8, image_size=(16, 16),
+                     key_layout=(2, 4))
+    first = await reg.get_native_tiles_async("spin", dev)
+    await reg.get_native_tiles_async("spin", dev)
+    assert len(first) == 2 and all(len(f) == 8 for f in first)
+    assert dev.encode_count == 16
+
+
+async def test_native_tiles_async_dedups_and_skips_stale_results():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    reg.upload("spin", base64.b64encode(_gif_bytes_animated(frames=2)).decode())
+    dev = MockDevice(id="m", model=DeviceModel.XL, key_count=8, image_size=(16, 16),
+                     key_layout=(2, 4))
+    results = await asyncio.gather(
+        *(reg.get_native_tiles_async("spin", dev) for _ in range(4))
+    )
+    assert all(r == results[0] for r in results)
+    assert dev.encode_count == 16
+    # Replaced while in flight: the old tiles are returned but not cached.
+    old = reg.upload("wide", base64.b64encode(_quadrants_png()).decode()).digest
+    pending = asyncio.ensure_future(reg.get_native_tiles_async("wide", dev))
+    await asyncio.sleep(0)
+    reg.upload("wide", base64.b64encode(_png_bytes()).decode())
+    assert len(await pending) == 1
+    await asyncio.sleep(0.05)
+    assert not any(k[0] == old for k in reg._cache._entries)
+
+
+async def test_async_resize_dedups_concurrent_misses():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    reg.upload("red", base64.b64encode(_png_bytes()).decode())
+    results = await asyncio.gather(
+        *(reg.get_resized_async("red", (96, 96)) for _ in range(5))
+    )
+    assert all(r is results[0] for r in results)  # one shared computation
+    assert reg.get_resized("red", (96, 96)) is results[0]
+    assert reg._inflight == {}
+    reg.close()
+
+
+async def test_async_resize_result_dropped_if_invalidated_in_flight():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    reg.upload("a", base64.b64encode(_png_bytes(color=(255, 0, 0))).decode())
+    pending = asyncio.ensure_future(reg.get_resized_async("a", (96, 96)))
+    await asyncio.sleep(0)
+    reg.upload("a", base64.b64encode(_png_bytes(color=(0, 255, 0))).decode())
+    await pending
+    fresh = await reg.get_resized_async("a", (96, 96))
+    assert fresh.getpixel((0, 0)) == (0, 255, 0)
+    reg.close()
+
+
+def test_frames_decoded_lazily_within_window():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024, frame_window=2)
+    asset = reg.upload("spin", base64.b64encode(_gif_bytes_animated(frames=3)).decode())
+    assert len(asset.data._frames) == 0  # nothing decoded at upload
+    colors = [asset.frame(i).getpixel((0, 0)) for i in (2, 0, 1, 2)]
+    assert colors == [(160, 0, 0), (0, 0, 0), (80, 0, 0), (160, 0, 0)]
+    assert list(asset.data._frames) == [1, 2]  # only the window stays decoded
+
+
+def test_packed_frames_round_trip_losslessly():
+    icon = Image.new("RGB", (64, 64))
+    icon.putdata([(i % 8 * 32, i // 8 % 8 * 32, 7) for i in range(64 * 64)])  # 64 colours
+    photo = Image.frombytes("RGB", (64, 64), bytes(range(256)) * 48)
+    for img in (icon, photo):
+        packed = PackedFrame(img)
+        assert packed.expand().tobytes() == img.tobytes()
+    assert PackedFrame(icon).palette is not None
+    assert PackedFrame(icon).nbytes < 64 * 64 * 3 // 2
+    assert PackedFrame(photo).palette is None
+
+
+def test_list_reports_resident_bytes():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    asset = reg.upload("a", base64.b64encode(_png_bytes(size=(72, 72))).decode())
+    assert not hasattr(asset, "__dict__")
+    [before] = reg.list()
+    assert before["resident_bytes"] == asset.size_bytes
+    reg.get_resized("a", (96, 96))
+    [after] = reg.list()
+    # One palette-indexed frame: a byte per pixel plus a one-colour palette.
+    assert after["resident_bytes"] == asset.size_bytes + 72 * 72 + 3
+
+
+def test_decoder_is_counted_and_released_after_last_frame():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    asset = reg.upload("g", base64.b64encode(_gif_bytes_animated(frames=3)).decode())
+    asset.frame(0)
+    packed = sum(f.nbytes for f in asset.data._frames.values())
+    held = asset.data.resident_bytes - asset.size_bytes - packed
+    assert held >= 40 * 40  # the open decoder's current frame
+    asset.frame(1)
+    asset.frame(2)
+    assert asset.data._decoder is None
+    packed = sum(f.nbytes for f in asset.data._frames.values())
+    assert asset.data.resident_bytes == asset.size_bytes + packed
+
+
+def test_cache_budget_bounds_resized_frames():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024,
+                        cache_bytes=2 * 96 * 96 * 3)
+    for i, name in enumerate("abc"):
+        reg.upload(name, base64.b64encode(_png_bytes(color=(i, 0, 0))).decode())
+        reg.get_resized(name, (96, 96))
+    stats = reg.cache_stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    reg.get_resized("c", (96, 96))
+    assert reg.cache_stats()["hits"] == 1
+    reg.remove("c")
+    assert reg.cache_stats()["entries"] == 1
+
+
+async def test_warm_restart_repaints_from_disk_without_pillow(tmp_path, monkeypatch):
+    from claude_streamdeck.core import asset_registry
+    from claude_streamdeck.core.disk_cache import DiskCache
+
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "spin.gif").write_bytes(_gif_bytes_animated(frames=3))
+    disk = DiskCache(tmp_path / "cache", max_bytes=1 << 20, max_age_s=3600)
+    cold = AssetRegistry(static_dir=tmp_path / "assets", disk_cache=disk)
+    dev = MockDevice(id="m", model=DeviceModel.XL, key_count=32, image_size=(8, 8))
+    expected = await cold.get_native_frames_async("spin", dev)
+    cold.close()
+
+    def no_pillow(*_a, **_k):
+        raise AssertionError("Pillow used on warm start")
+
+    monkeypatch.setattr(asset_registry.Image, "open", no_pillow)
+    warm = AssetRegistry(static_dir=tmp_path / "assets", disk_cache=disk)
+    dev2 = MockDevice(id="m", model=DeviceModel.XL, key_count=32, image_size=(8, 8))
+    assert warm.get("spin").frame_count == 3
+    assert await warm.get_native_frames_async("spin", dev2) == expected
+    assert await warm.get_native_async("spin", dev2, 1) == expected[1]
+    assert dev2.encode_count == 0
+    warm.close()
+
+
+async def test_identical_uploads_share_payload_and_variants():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    data = base64.b64encode(_png_bytes()).decode()
+    a = reg.upload("status-thinking-1", data)
+    b = reg.upload("status-thinking-2", data)
+    assert a.data is b.data and a.data.refs == 2
+    dev = MockDevice(id="m", model=DeviceModel.XL, key_count=32, image_size=(8, 8))
+    first = await reg.get_native_async("status-thinking-1", dev)
+    assert first == await reg.get_native_async("status-thinking-2", dev)
+    assert dev.encode_count == 1
+    reg.remove("status-thinking-1")
+    assert reg.cache_stats()["entries"] == 2  # still referenced by -2
+    await reg.get_native_async("status-thinking-2", dev)
+    assert dev.encode_count == 1
+    reg.remove("status-thinking-2")
+    assert reg.cache_stats()["entries"] == 0
+    assert a.data.refs == 0
+
+
+def test_reupload_with_new_bytes_releases_old_payload():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    old = reg.upload("a", base64.b64encode(_png_bytes(color=(1, 2, 3))).decode())
+    reg.get_resized("a", (96, 96))
+    new = reg.upload("a", base64.b64encode(_png_bytes(color=(4, 5, 6))).decode())
+    assert old.data.refs == 0 and new.data.refs == 1
+    assert reg.cache_stats()["entries"] == 0
+    assert reg.get_resized("a", (96, 96)).getpixel((0, 0)) == (4, 5, 6)
+
+
+def test_bind_by_digest_survives_restart_via_disk(tmp_path):
+    import hashlib
+
+    from claude_streamdeck.core.disk_cache import DiskCache
+
+    disk = DiskCache(tmp_path, max_bytes=1 << 20, max_age_s=3600)
+    raw = _png_bytes(color=(9, 8, 7))
+    digest = hashlib.sha256(raw).hexdigest()
+    first = AssetRegistry(static_dir=None, disk_cache=disk)
+    assert first.bind("a", digest) is None
+    first.upload("a", base64.b64encode(raw).decode())
+    same = first.bind("a", digest)
+    assert same is first.get("a")  # unchanged binding keeps its identity
+    first.close()  # lets the source write that runs off the caller finish
+    restarted = AssetRegistry(static_dir=None, disk_cache=disk)
+    asset = restarted.bind("b", digest)
+    assert asset is not None and asset.source == raw
+    assert restarted.get_resized("b", (4, 4)).getpixel((0, 0)) == (9, 8, 7)
+
+
+async def test_static_dir_indexed_without_reading(tmp_path, monkeypatch):
+    for i, name in enumerate(("a", "b", "c")):
+        (tmp_path / f"{name}.png").write_bytes(_png_bytes(color=(i, 0, 0)))
+    (tmp_path / "notes.txt").write_text("skip me")
+    reads = []
+    real = Path.read_bytes
+    monkeypatch.setattr(Path, "read_bytes", lambda p: reads.append(p.name) or real(p))
+    reg = AssetRegistry(static_dir=tmp_path)
+    assert reads == [] and sorted(reg._static) == ["a", "b", "c"]
+    assert reg.get("b").size_bytes == (tmp_path / "b.png").stat().st_size
+    assert reads == ["b.png"]
+    listed = {a["name"]: a for a in reg.list()}
+    assert reads == ["b.png"]  # listing reports pending files without reading them
+    assert listed["b"]["loaded"] is True and listed["b"]["digest"]
+    assert listed["a"] == {"name": "a", "loaded": False, "path": str(tmp_path / "a.png"),
+                           "size_bytes": (tmp_path / "a.png").stat().st_size}
+    await reg.warm_static()
+    assert sorted(reads) == ["a.png", "b.png", "c.png"]
+    assert reg._static == {}
+    assert [a["name"] for a in reg.list()] == ["b", "a", "c"]
+    reg.close()
+
+
+async def test_upload_overrides_pending_static_entry(tmp_path):
+    (tmp_path / "a.png").write_bytes(_png_bytes(color=(1, 1, 1)))
+    reg = AssetRegistry(static_dir=tmp_path)
+    reg.upload("a", base64.b64encode(_png_bytes(color=(2, 2, 2))).decode())
+    await reg.warm_static()
+    assert reg.get_resized("a", (4, 4)).getpixel((0, 0)) == (2, 2, 2)
+    reg.close()
+
+
+def test_reload_static_only_touches_changed_file(tmp_path):
+    (tmp_path / "a.png").write_bytes(_png_bytes(color=(1, 1, 1)))
+    (tmp_path / "b.png").write_bytes(_png_bytes(color=(2, 2, 2)))
+    reg = AssetRegistry(static_dir=tmp_path)
+    reg.get_resized("a", (4, 4))
+    reg.get_resized("b", (4, 4))
+    (tmp_path / "a.png").write_bytes(_png_bytes(color=(3, 3, 3)))
+    assert reg.reload_static(tmp_path / "a.png") is True
+    assert reg.reload_static(tmp_path / "b.png") is False  # same bytes
+    assert reg.cache_stats()["entries"] == 1  # only a's resize was dropped
+    assert reg.get_resized("a", (4, 4)).getpixel((0, 0)) == (3, 3, 3)
+
+    (tmp_path / "c.png").write_bytes(_png_bytes())
+    assert reg.reload_static(tmp_path / "c.png") is False  # indexed, not loaded
+    assert "c" in reg._static
+    (tmp_path / "b.png").unlink()
+    reg.reload_static(tmp_path / "b.png")
+    with pytest.raises(AssetNotFoundError):
+        reg.get("b")
+
+
+def test_reload_static_leaves_uploaded_names_alone(tmp_path):
+    (tmp_path / "a.png").write_bytes(_png_bytes(color=(1, 1, 1)))
+    reg = AssetRegistry(static_dir=tmp_path)
+    reg.upload("a", base64.b64encode(_png_bytes(color=(5, 5, 5))).decode())
+    (tmp_path / "a.png").write_bytes(_png_bytes(color=(3, 3, 3)))
+    assert reg.reload_static(tmp_path / "a.png") is False
+    assert reg.get_resized("a", (4, 4)).getpixel((0, 0)) == (5, 5, 5)
+
+
+def test_upload_file_reads_bytes_directly(tmp_path):
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    raw = _png_bytes(color=(7, 7, 7))
+    (tmp_path / "x.png").write_bytes(raw)
+    asset = reg.upload_file("x", tmp_path / "x.png")
+    assert asset.source == raw
+    with pytest.raises(InvalidAssetDataError):
+        reg.upload_file("y", tmp_path / "missing.png")
+    with pytest.raises(InvalidAssetDataError):
+        reg.upload_file("y", tmp_path)  # not a regular file
+    small = AssetRegistry(static_dir=None, max_size_bytes=10)
+    with pytest.raises(AssetTooLargeError):
+        small.upload_file("x", tmp_path / "x.png")
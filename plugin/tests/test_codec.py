@@ -0,0 +1,54 @@
+"""Tests for the protocol JSON codecs."""
+
+import json
+import math
+
+import pytest
+
+from claude_streamdeck.transport import codec as codec_mod
+from claude_streamdeck.transport.codec import JSONCodec, get_codec
+
+_SAMPLES = [
+    {"cmd": "display.set", "request_id": "r1", "device_id": "xl-1", "button": 3,
+     "asset": "thinking"},
+    {"ok": True, "request_id": "r1", "result": {"assets": [], "hit_ratio": 0.125}},
+    {"event": "button.pressed", "ts": 1700000000000, "device_id": "xl-1", "button": 7},
+    {"text": "café ☃ \U0001f600 \"quoted\" \\ \n\t", "none": None, "n": -1e-7},
+    [1, 2.5, True, False, None, "", {}, []],
+]
+
+
+def _codecs():
+    out = [JSONCodec()]
+    if codec_mod.orjson is not None:
+        out.append(get_codec("orjson"))
+    return out
+
+
+@pytest.mark.parametrize("c", _codecs(), ids=lambda c: c.name)
+def test_encoding_is_byte_identical_to_json_dumps(c):
+    for obj in _SAMPLES:
+        assert c.dumps_line(obj) == (json.dumps(obj) + "\n").encode("utf-8")
+
+
+@pytest.mark.parametrize("c", _codecs(), ids=lambda c: c.name)
+def test_decoding_matches_stdlib(c):
+    for obj in _SAMPLES:
+        line = json.dumps(obj, ensure_ascii=False).encode()
+        assert c.loads(line) == json.loads(line)
+    # Input orjson rejects or reads differently still decodes like stdlib.
+    assert math.isnan(c.loads(b'{"x": NaN}')["x"])
+    for big in (123456789012345678901234567890, 2**64, -(2**63) - 1):
+        assert c.loads(b'{"n": %d}' % big) == {"n": big}
+    assert c.loads(b"[1E400]") == [math.inf]
+    assert c.loads(b'"\\ud800"') == "\ud800"
+    with pytest.raises(ValueError):
+        c.loads(b'{"cmd": ')
+
+
+def test_get_codec_names():
+    assert get_codec("json").name == "json"
+    expected = "orjson" if codec_mod.orjson is not None else "json"
+    assert get_codec("auto").name == expected
+    with pytest.raises(ValueError):
+        get_codec("yaml")
@@ -12,6 +12,7 @@ def test_defaults_when_no_file(tmp_path: Path):
     assert isinstance(cfg, DaemonConfig)
     assert cfg.socket_path.name == "daemon.sock"
     assert cfg.extensions == []
+    assert cfg.prepare_workers == 0
 
 
 def test_loads_from_toml(tmp_path: Path):
@@ -20,6 +21,9 @@ def test_loads_from_toml(tmp_path: Path):
 [daemon]
 socket_path = "/tmp/x.sock"
 assets_dir = "/tmp/assets"
+prepare_workers = 4
+cache_bytes = 1048576
+slow_consumer_policy = "coalesce"
 
 [[extensions]]
 module = "claude_streamdeck.extensions.echo"
@@ -28,6 +32,10 @@ config = { log_level = "debug" }
     cfg = load_config(f)
     assert str(cfg.socket_path) == "/tmp/x.sock"
     assert str(cfg.assets_dir) == "/tmp/assets"
+    assert cfg.prepare_workers == 4
+    assert cfg.cache_bytes == 1048576
+    assert cfg.slow_consumer_policy == "coalesce"
+    assert cfg.outbound_queue == 256
     assert cfg.extensions == [
         {"module": "claude_streamdeck.extensions.echo", "config": {"log_level": "debug"}}
     ]
@@ -42,3 +50,8 @@ socket_path = "~/sock"
 """)
     cfg = load_config(f)
     assert str(cfg.socket_path) == str(tmp_path / "sock")
+
+
+def test_max_line_fits_a_base64_asset():
+    cfg = DaemonConfig(max_asset_bytes=3 * 1024 * 1024)
+    assert cfg.max_line_bytes == 4 * 1024 * 1024 + 64 * 1024
@@ -47,6 +47,7 @@ async def test_send_event_includes_ts():
     r, w, buf = await _pipe()
     c = Connection(r, w)
     await c.send_event("button.pressed", {"device_id": "x", "button": 1})
+    await c.flush()
     obj = json.loads(bytes(buf).decode().strip())
     assert obj["event"] == "button.pressed"
     assert obj["device_id"] == "x"
@@ -109,3 +110,116 @@ def test_subscription_set_default_empty():
     assert "input" not in c.subscriptions
     c.subscriptions.add("input")
     assert "input" in c.subscriptions
+
+
+async def test_iter_messages_handles_lines_beyond_readline_limit():
+    r = asyncio.StreamReader()  # default 64 KiB limit
+    big = {"cmd": "asset.upload", "data": "A" * 300_000}
+    data = (json.dumps(big) + "\n").encode()
+    for i in range(0, len(data), 7000):  # arrives in many small pieces
+        r.feed_data(data[i:i + 7000])
+    r.feed_data(b'{"cmd":"after"}')  # final line without a newline
+    r.feed_eof()
+    c = Connection(r, None)
+    msgs = [m async for m in c.iter_messages()]
+    assert msgs == [big, {"cmd": "after"}]
+
+
+async def test_oversized_line_is_skipped_and_reported():
+    from claude_streamdeck.transport.connection import OversizedLine
+
+    r = asyncio.StreamReader()
+    r.feed_data(b'{"cmd":"a"}\n' + b"x" * 5000 + b'\n{"cmd":"b"}\n')
+    r.feed_eof()
+    c = Connection(r, None, max_line_bytes=1000)
+    msgs = [m async for m in c.iter_messages()]
+    assert msgs == [{"cmd": "a"}, OversizedLine(size=5000), {"cmd": "b"}]
+
+
+class _StuckWriter:
+    """A client that has stopped reading: drain() blocks until released."""
+
+    def __init__(self):
+        self.lines = []
+        self.gate = asyncio.Event()
+        self.closed = False
+
+    def write(self, data): self.lines.append(data)
+    async def drain(self): await self.gate.wait()
+    def close(self): self.closed = True
+    async def wait_closed(self): pass
+    def is_closing(self): return self.closed
+
+
+def _events(lines):
+    return [(o["event"], o["button"]) for o in map(json.loads, b"".join(lines).splitlines())]
+
+
+async def test_send_event_does_not_wait_for_slow_client():
+    w = _StuckWriter()
+    c = Connection(None, w, max_queue=2)
+    for button in range(5):
+        await asyncio.wait_for(
+            c.send_event("button.pressed", {"device_id": "d", "button": button}), 0.1
+        )
+    await asyncio.sleep(0)
+    # Button 0 went to the writer straight away; of the rest the oldest were dropped.
+    assert c.stats()["queued"] == 2 and c.dropped == 2
+    w.gate.set()
+    await c.flush()
+    assert _events(w.lines) == [("button.pressed", b) for b in (0, 3, 4)]
+    await c.close()
+
+
+async def test_coalesce_keeps_latest_event_per_button():
+    w = _StuckWriter()
+    c = Connection(None, w, max_queue=2, policy="coalesce")
+    await c.send_event("button.pressed", {"device_id": "d", "button": 9})
+    await asyncio.sleep(0)  # the writer takes it and blocks in drain()
+    for button in (1, 2, 1, 1, 3):
+        await c.send_event("button.pressed", {"device_id": "d", "button": button})
+    assert (c.coalesced, c.dropped) == (2, 1)
+    w.gate.set()
+    await c.flush()
+    assert [b for _, b in _events(w.lines)] == [9, 1, 3]
+    await c.close()
+
+
+async def test_disconnect_policy_closes_connection():
+    w = _StuckWriter()
+    c = Connection(None, w, max_queue=1, policy="disconnect")
+    for button in range(3):
+        await c.send_event("button.pressed", {"device_id": "d", "button": button})
+        await asyncio.sleep(0)
+    assert w.closed and c.disconnected
+    await c.close()
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        Connection(None, None, policy="block")
+
+
+async def test_disconnect_fails_queued_response():
+    w = _StuckWriter()
+    c = Connection(None, w, max_queue=4, policy="disconnect")
+    await c.send_event("button.pressed", {"device_id": "d", "button": 0})
+    await asyncio.sleep(0)  # the writer takes it and blocks in drain()
+    response = asyncio.create_task(c.send_response("r1", ok=True))
+    await asyncio.sleep(0)
+    for button in range(1, 6):
+        await c.send_event("button.pressed", {"device_id": "d", "button": button})
+    assert c.disconnected
+    with pytest.raises(ConnectionResetError):
+        await asyncio.wait_for(response, 1.0)
+    await c.close()
+
+
+async def test_close_fails_response_being_written():
+    w = _StuckWriter()
+    c = Connection(None, w)
+    response = asyncio.create_task(c.send_response("r1", ok=True))
+    await asyncio.sleep(0.01)  # written, stuck in drain()
+    await c.close()
+    with pytest.raises(ConnectionResetError):
+        await asyncio.wait_for(response, 1.0)
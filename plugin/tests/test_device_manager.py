@@ -13,6 +13,7 @@ def _fake_xl(serial="ABCDEF", key_count=32, hid_id="DevSrvsID:1"):
     fake.deck_type.return_value = "Stream Deck XL"
     fake.key_count.return_value = key_count
     fake.key_image_format.return_value = {"size": (96, 96), "format": "JPEG"}
+    fake.key_layout.return_value = (4, 8)
     fake.get_serial_number.return_value = serial
     fake.id.return_value = hid_id
     fake.open = MagicMock()
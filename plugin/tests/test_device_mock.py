@@ -30,6 +30,14 @@ def test_mock_device_records_set_key_image():
     assert d.set_key_calls == [(5, img)]
 
 
+def test_mock_device_native_roundtrip():
+    d = MockDevice(id="m", model=DeviceModel.XL, key_count=32, image_size=(96, 96))
+    img = Image.new("RGB", (96, 96), (1, 2, 3))
+    d.set_key_native(4, d.encode_key_image(img))
+    assert d.encode_count == 1
+    assert d.last_image_for(4).getpixel((0, 0)) == (1, 2, 3)
+
+
 def test_mock_device_clear_key_records():
     d = MockDevice(id="m", model=DeviceModel.XL, key_count=32, image_size=(96, 96))
     d.clear_key(7)
@@ -0,0 +1,60 @@
+"""Tests for the content-addressed DiskCache."""
+
+import os
+import time
+
+from claude_streamdeck.core.disk_cache import DiskCache
+
+
+def test_frames_and_meta_round_trip(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=1 << 20, max_age_s=3600)
+    key = DiskCache.frame_key("ab" * 32, (96, 96), "jpeg", 0)
+    assert cache.get_frame(key) is None
+    cache.put_frame(key, b"encoded")
+    cache.put_meta("ab" * 32, {"frame_durations_ms": [100, 50]})
+    assert cache.get_frame(key) == b"encoded"
+    assert cache.get_meta("ab" * 32) == {"frame_durations_ms": [100, 50]}
+    assert not list(tmp_path.rglob(".tmp-*"))
+
+
+def test_frame_key_covers_size_encoder_and_index():
+    keys = {
+        DiskCache.frame_key("d", (96, 96), "jpeg", 0),
+        DiskCache.frame_key("d", (72, 72), "jpeg", 0),
+        DiskCache.frame_key("d", (96, 96), "bmp", 0),
+        DiskCache.frame_key("d", (96, 96), "jpeg", 1),
+        DiskCache.frame_key("e", (96, 96), "jpeg", 0),
+    }
+    assert len(keys) == 5
+
+
+def test_gc_removes_expired_then_oldest_over_budget(tmp_path):
+    # Filled through a roomy cache so writes don't start a pass of their own.
+    filler = DiskCache(tmp_path, max_bytes=1 << 20, max_age_s=3600)
+    cache = DiskCache(tmp_path, max_bytes=25, max_age_s=3600)
+    now = time.time()
+    ages = {"old": 7200, "a": 300, "b": 200, "c": 100}
+    for name, age in ages.items():
+        key = DiskCache.frame_key(name, (1, 1), "raw", 0)
+        filler.put_frame(key, b"x" * 10)
+        path = tmp_path / "frames" / key[:2] / key
+        os.utime(path, (now - age, now - age))
+    assert cache.gc() == 2  # "old" expired, then "a" to fit 25 bytes
+    left = {name for name in ages
+            if cache.get_frame(DiskCache.frame_key(name, (1, 1), "raw", 0))}
+    assert left == {"b", "c"}
+
+
+def test_writes_past_a_tenth_of_the_budget_run_gc(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=1000, max_age_s=3600)
+    keys = [DiskCache.frame_key(str(i), (1, 1), "raw", 0) for i in range(12)]
+    for key in keys[:9]:
+        cache.put_frame(key, b"x" * 10)
+    old = time.time() - 7200
+    os.utime(tmp_path / "frames" / keys[0][:2] / keys[0], (old, old))
+    cache.put_frame(keys[9], b"x" * 10)  # 100 bytes since the last pass
+    assert cache.get_frame(keys[0]) is None
+    assert cache.get_frame(keys[1]) == b"x" * 10
+    cache.put_frame(keys[10], b"x" * 1000)  # over budget: oldest go
+    assert cache.get_frame(keys[10]) == b"x" * 1000
+    assert cache.get_frame(keys[1]) is None
@@ -8,7 +8,7 @@ from pathlib import Path
 import pytest
 from PIL import Image
 
-from claude_streamdeck.core.asset_registry import AssetRegistry
+from claude_streamdeck.core.asset_registry import AssetNotFoundError, AssetRegistry
 from claude_streamdeck.core.device import DeviceModel, MockDevice
 from claude_streamdeck.core.display_engine import (
     ButtonOutOfRangeError,
@@ -49,6 +49,33 @@ async def test_set_image_pushes_to_device():
     assert dev.last_image_for(5).size == (96, 96)
 
 
+async def test_set_image_same_asset_is_skipped():
+    reg, dev, eng = _make()
+    reg.upload("a", _png())
+    await eng.set_image(dev.id, 5, "a")
+    await eng.set_image(dev.id, 5, "a")
+    await eng.clear(dev.id, 6)
+    await eng.clear(dev.id, 6)
+    assert len(dev.set_key_calls) == 1
+    assert dev.cleared_keys == [6]
+    stats = {s["button"]: s["skipped_writes"] for s in eng.stats()}
+    assert stats == {5: 1, 6: 1}
+
+
+async def test_set_image_rewrites_after_reupload_or_animation():
+    reg, dev, eng = _make()
+    reg.upload("a", _png(color=(1, 1, 1)))
+    await eng.set_image(dev.id, 5, "a")
+    reg.upload("a", _png(color=(2, 2, 2)))
+    await eng.set_image(dev.id, 5, "a")
+    assert dev.last_image_for(5).getpixel((0, 0)) == (2, 2, 2)
+    reg.upload("g", _gif(frames=3))
+    await eng.animate(dev.id, 5, asset="g", loop=True)
+    await eng.set_image(dev.id, 5, "a")
+    assert dev.last_image_for(5).getpixel((0, 0)) == (2, 2, 2)
+    assert eng.stats() == []  # nothing was short-circuited
+
+
 async def test_set_image_unknown_asset_raises():
     reg, dev, eng = _make()
     from claude_streamdeck.core.asset_registry import AssetNotFoundError
@@ -80,6 +107,16 @@ async def test_animate_cycles_frames():
     assert len(images) >= 2
 
 
+async def test_animate_encodes_frames_once():
+    reg, dev, eng = _make()
+    reg.upload("g", _gif(frames=3))
+    await eng.animate(dev.id, 0, asset="g", loop=True)
+    await asyncio.sleep(0.15)  # several passes over the 3 frames
+    await eng.stop_animation(dev.id, 0, mode="freeze")
+    assert len([1 for k, _ in dev.set_key_calls if k == 0]) > 3
+    assert dev.encode_count == 3
+
+
 async def test_set_image_cancels_running_animation():
     reg, dev, eng = _make()
     reg.upload("g", _gif(frames=3))
@@ -119,3 +156,211 @@ async def test_purge_device_stops_animations():
     await asyncio.sleep(0.1)
     post = len([1 for k, _ in dev.set_key_calls if k == 0])
     assert pre == post
+
+
+async def test_animate_group_is_phase_locked_and_stops_as_one():
+    reg, dev, eng = _make()
+    reg.upload("r", _png(color=(255, 0, 0)))
+    reg.upload("b", _png(color=(0, 0, 255)))
+    frames = [
+        {"assets": ["r", "b"], "duration_ms": 20},
+        {"assets": ["b", "r"], "duration_ms": 20},
+    ]
+    await eng.animate_group(dev.id, [0, 1], frames, loop=True)
+    await asyncio.sleep(0.1)
+    await eng.stop_animation(dev.id, 1, mode="clear")
+    left = [img.getpixel((0, 0)) for k, img in dev.set_key_calls if k == 0]
+    right = [img.getpixel((0, 0)) for k, img in dev.set_key_calls if k == 1]
+    assert len(left) == len(right) >= 3
+    assert all(a != b for a, b in zip(left, right))
+    assert sorted(dev.cleared_keys) == [0, 1]
+    await asyncio.sleep(0.05)
+    assert len([1 for k, _ in dev.set_key_calls if k == 0]) == len(left)
+
+
+async def test_animate_group_rejects_mismatched_frames():
+    reg, dev, eng = _make()
+    reg.upload("r", _png())
+    with pytest.raises(ValueError):
+        await eng.animate_group(dev.id, [0, 1], [{"assets": ["r"]}])
+
+
+async def test_rejected_animate_group_keeps_pending_writes():
+    reg, dev, eng = _make()
+    reg.upload("r", _png(color=(5, 5, 5)))
+    pending = asyncio.create_task(eng.set_image(dev.id, 0, "r"))
+    await asyncio.sleep(0)
+    with pytest.raises(ValueError):
+        await eng.animate_group(dev.id, [0, 1], [{"assets": ["r"]}])
+    with pytest.raises(AssetNotFoundError):
+        await eng.animate_group(dev.id, [0, 1], [{"assets": ["r", "nope"]}])
+    await pending
+    assert dev.last_image_for(0).getpixel((0, 0)) == (5, 5, 5)
+
+
+async def test_set_tiled_paints_every_key_once():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    dev = MockDevice(id="xl-t", model=DeviceModel.XL, key_count=8, image_size=(16, 16),
+                     key_layout=(2, 4))
+    eng = DisplayEngine(reg)
+    eng.register_device(dev)
+    reg.upload("big", _png(size=(64, 32)))
+    await eng.set_tiled(dev.id, "big")
+    await eng.set_tiled(dev.id, "big")
+    assert sorted(k for k, _ in dev.set_key_calls) == list(range(8))
+    reg.upload("anim", _gif(frames=3, size=(64, 32)))
+    await eng.set_tiled(dev.id, "anim")
+    await asyncio.sleep(0.05)
+    await eng.stop_animation(dev.id, 0, mode="freeze")
+    assert len(dev.set_key_calls) >= 8 + 8 * 2
+
+
+async def test_animation_starts_before_all_frames_are_ready():
+    reg, dev, eng = _make()
+    reg.upload("g", _gif(frames=6))
+    gate = asyncio.Event()
+    real = reg.get_native_async
+
+    async def slow(name, device, index=0):
+        if index > 0:
+            await gate.wait()
+        return await real(name, device, index)
+
+    reg.get_native_async = slow
+    await eng.animate(dev.id, 0, asset="g", loop=True)
+    assert len(dev.set_key_calls) == 1  # first frame shown immediately
+    await asyncio.sleep(0.06)
+    # Looping over the single ready frame, no other frame shown yet.
+    assert {img.tobytes() for _, img in dev.set_key_calls} == {
+        dev.set_key_calls[0][1].tobytes()
+    }
+    gate.set()
+    await asyncio.sleep(0.15)
+    await eng.stop_animation(dev.id, 0, mode="freeze")
+    assert len({img.tobytes() for _, img in dev.set_key_calls}) >= 3
+
+
+async def test_refresh_asset_repaints_only_buttons_showing_it():
+    reg, dev, eng = _make()
+    reg.upload("a", _png(color=(1, 1, 1)))
+    reg.upload("b", _png(color=(2, 2, 2)))
+    reg.upload("spin", _gif())
+    await eng.set_image("xl-1", 0, "a")
+    await eng.set_image("xl-1", 1, "b")
+    await eng.animate("xl-1", 2, asset="spin")
+    reg.upload("a", _png(color=(9, 9, 9)))
+    dev.set_key_calls.clear()
+    await eng.refresh_asset("a")
+    assert [(k, img.getpixel((0, 0))) for k, img in dev.set_key_calls] == [(0, (9, 9, 9))]
+    dev.set_key_calls.clear()
+    await eng.refresh_asset("spin")
+    assert [k for k, _ in dev.set_key_calls] == [2]  # restarted on its first frame
+    assert eng._animations[("xl-1", 2)].loop is True
+
+
+async def test_refresh_asset_leaves_repainted_tiles_alone():
+    reg = AssetRegistry(static_dir=None, max_size_bytes=1024 * 1024)
+    dev = MockDevice(id="xl-t", model=DeviceModel.XL, key_count=8, image_size=(16, 16),
+                     key_layout=(2, 4))
+    eng = DisplayEngine(reg)
+    eng.register_device(dev)
+    reg.upload("bg", _png(color=(1, 1, 1), size=(64, 32)))
+    reg.upload("x", _png(color=(7, 7, 7)))
+    await eng.set_tiled(dev.id, "bg")
+    await eng.set_image(dev.id, 5, "x")
+    reg.upload("bg", _png(color=(9, 9, 9), size=(64, 32)))
+    dev.set_key_calls.clear()
+    await eng.refresh_asset("bg")
+    assert sorted(k for k, _ in dev.set_key_calls) == [0, 1, 2, 3, 4, 6, 7]
+    assert eng._shown[(dev.id, 5)][0] == "x"
+
+
+async def test_out_of_order_completion_keeps_latest_request():
+    reg, dev, eng = _make()
+    reg.upload("old", _png(color=(1, 1, 1)))
+    reg.upload("new", _png(color=(2, 2, 2)))
+    gate = asyncio.Event()
+    real = reg.get_native_async
+
+    async def slow(name, device, index=0):
+        if name == "old":
+            await gate.wait()
+        return await real(name, device, index)
+
+    reg.get_native_async = slow
+    first = asyncio.create_task(eng.set_image(dev.id, 4, "old"))
+    await asyncio.sleep(0)
+    await eng.set_image(dev.id, 4, "new")
+    first_many = asyncio.create_task(eng.set_many([(dev.id, 5, "old")]))
+    await asyncio.sleep(0)
+    await eng.clear(dev.id, 5)
+    gate.set()
+    await first
+    assert await first_many == [None]
+    assert [k for k, _ in dev.set_key_calls] == [4]
+    assert dev.last_image_for(4).getpixel((0, 0)) == (2, 2, 2)
+    assert eng._shown[(dev.id, 4)][0] == "new"
+    assert dev.cleared_keys == [5]
+
+
+async def test_identical_reupload_keeps_unchanged_skip():
+    reg, dev, eng = _make()
+    data = _png(color=(3, 3, 3))
+    first = reg.upload("a", data)
+    await eng.set_image(dev.id, 5, "a")
+    assert reg.upload("a", data).generation == first.generation
+    await eng.set_image(dev.id, 5, "a")
+    assert len(dev.set_key_calls) == 1
+    assert reg.upload("a", _png(color=(4, 4, 4))).generation != first.generation
+
+
+async def test_animation_restarts_when_asset_replaced_while_filling():
+    reg, dev, eng = _make()
+    reg.upload("g", _gif(frames=4))
+    gate = asyncio.Event()
+    real = reg.get_native_async
+
+    async def slow(name, device, index=0):
+        if index > 0:
+            await gate.wait()
+        return await real(name, device, index)
+
+    reg.get_native_async = slow
+    await eng.animate(dev.id, 0, asset="g", loop=True)
+    old = eng._animations[(dev.id, 0)]
+    green = [Image.new("RGB", (40, 40), (0, 60 * i, 0)) for i in range(1, 4)]
+    buf = io.BytesIO()
+    green[0].save(buf, format="GIF", save_all=True, append_images=green[1:],
+                  duration=20, loop=0)
+    reg.upload("g", base64.b64encode(buf.getvalue()).decode())
+    gate.set()
+    await asyncio.sleep(0.1)
+    new = eng._animations[(dev.id, 0)]
+    assert new is not old and old.cancelled
+    assert len(old.sequence) == 1  # no new frames mixed into the old run
+    assert len(new.sequence) == 3
+    await eng.stop_animation(dev.id, 0, mode="freeze")
+    assert dev.last_image_for(0).getpixel((0, 0))[0] == 0  # showing green frames
+
+
+async def test_replaced_animation_does_not_override_newer_request():
+    reg, dev, eng = _make()
+    reg.upload("g", _gif(frames=4))
+    reg.upload("x", _png(color=(7, 7, 7)))
+    gate = asyncio.Event()
+    real = reg.get_native_async
+
+    async def slow(name, device, index=0):
+        if index > 0:
+            await gate.wait()
+        return await real(name, device, index)
+
+    reg.get_native_async = slow
+    await eng.animate(dev.id, 3, asset="g", loop=True)
+    reg.upload("g", _gif(frames=3))
+    set_x = asyncio.create_task(eng.set_image(dev.id, 3, "x"))
+    gate.set()
+    await set_x
+    await asyncio.sleep(0.1)
+    assert (dev.id, 3) not in eng._animations
+    assert dev.last_image_for(3).getpixel((0, 0)) == (7, 7, 7)
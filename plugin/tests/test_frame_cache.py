@@ -0,0 +1,67 @@
+"""Tests for the byte-budgeted FrameCache."""
+
+from pathlib import Path
+
+from PIL import Image
+
+from claude_streamdeck.core.frame_cache import FrameCache
+
+
+def _meminfo(tmp_path: Path, available_kb: int, total_kb: int = 1000) -> Path:
+    f = tmp_path / "meminfo"
+    f.write_text(f"MemTotal: {total_kb} kB\nMemFree: 1 kB\n"
+                 f"MemAvailable: {available_kb} kB\n")
+    return f
+
+
+def test_evicts_least_recently_used_past_budget(tmp_path):
+    cache = FrameCache(30, meminfo=_meminfo(tmp_path, 900))
+    cache[("a", 0)] = b"x" * 10
+    cache[("b", 0)] = b"x" * 10
+    cache[("c", 0)] = b"x" * 10
+    assert cache.get(("a", 0)) is not None  # a is now most recent
+    cache[("d", 0)] = b"x" * 10
+    assert ("b", 0) not in cache
+    assert all(k in cache for k in (("a", 0), ("c", 0), ("d", 0)))
+    stats = cache.stats()
+    assert stats["bytes"] == 30
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 4, 1)
+
+
+def test_images_are_sized_by_pixels(tmp_path):
+    cache = FrameCache(100_000, meminfo=_meminfo(tmp_path, 900))
+    cache[("a", 0)] = Image.new("RGB", (96, 96))
+    cache[("a", 1)] = [Image.new("RGB", (10, 10))] * 2
+    assert cache.stats()["bytes"] == 96 * 96 * 3 + 2 * 300
+
+
+def test_invalidate_only_touches_that_name(tmp_path):
+    cache = FrameCache(1000, meminfo=_meminfo(tmp_path, 900))
+    cache.update([(("a", i), b"1") for i in range(3)] + [(("b", 0), b"22")])
+    cache.invalidate("a")
+    assert len(cache) == 1 and ("b", 0) in cache
+    assert cache.stats()["bytes"] == 2
+    cache.invalidate("missing")  # no-op
+
+
+def test_oversized_entry_is_not_cached(tmp_path):
+    cache = FrameCache(10, meminfo=_meminfo(tmp_path, 900))
+    cache[("a", 0)] = b"x" * 5
+    cache[("big", 0)] = b"x" * 11
+    assert ("big", 0) not in cache and ("a", 0) in cache
+
+
+def test_shrinks_under_memory_pressure(tmp_path):
+    cache = FrameCache(40, meminfo=_meminfo(tmp_path, 50))  # 5% available
+    for i in range(4):
+        cache[("a", i)] = b"x" * 10
+    stats = cache.stats()
+    assert stats["effective_budget_bytes"] == 10
+    assert stats["bytes"] <= 10
+
+
+def test_missing_meminfo_keeps_full_budget(tmp_path):
+    cache = FrameCache(40, meminfo=tmp_path / "nope")
+    for i in range(4):
+        cache[("a", i)] = b"x" * 10
+    assert cache.stats()["bytes"] == 40
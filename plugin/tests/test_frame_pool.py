@@ -0,0 +1,49 @@
+"""Tests for the optional frame-preparation process pool."""
+
+import base64
+import io
+from functools import partial
+
+from PIL import Image
+
+from claude_streamdeck.core.asset_registry import AssetRegistry
+from claude_streamdeck.core.device import DeviceModel, MockDevice
+from claude_streamdeck.core.device_xl import encode_key_format
+from claude_streamdeck.core.frame_pool import FramePool
+
+
+def _gif(frames=20, size=(40, 40)) -> bytes:
+    images = [Image.new("RGB", size, (i * 12, 0, 0)) for i in range(frames)]
+    buf = io.BytesIO()
+    images[0].save(buf, format="GIF", save_all=True, append_images=images[1:],
+                   duration=50, loop=0)
+    return buf.getvalue()
+
+
+async def test_pool_matches_in_process_frames():
+    dev = MockDevice(id="m", model=DeviceModel.XL, key_count=32, image_size=(24, 24))
+    local = AssetRegistry(static_dir=None)  # in-process reference
+    pooled = AssetRegistry(static_dir=None, prepare_workers=2)
+    data = base64.b64encode(_gif()).decode()
+    local.upload("g", data)
+    pooled.upload("g", data)
+    try:
+        frames = await pooled.get_native_frames_async("g", dev)
+        assert frames == await local.get_native_frames_async("g", dev)
+        # Cached afterwards: the second call doesn't touch the pool.
+        again = await pooled.get_native_frames_async("g", dev)
+        assert all(a is b for a, b in zip(frames, again))
+    finally:
+        pooled.close()
+
+
+async def test_pool_encodes_with_picklable_device_encoder():
+    fmt = {"size": (24, 24), "format": "JPEG", "flip": (True, True), "rotation": 0}
+    pool = FramePool(workers=2)
+    try:
+        out = await pool.prepare(_gif(frames=5), 5, (24, 24),
+                                 partial(encode_key_format, fmt))
+    finally:
+        pool.close()
+    assert len(out) == 5
+    assert all(b[:2] == b"\xff\xd8" for b in out)  # JPEG SOI marker
@@ -2,19 +2,21 @@
 
 import asyncio
 import base64
+import hashlib
 import io
 
 import pytest
 from PIL import Image
 
-from claude_streamdeck.core.asset_registry import AssetRegistry
-from claude_streamdeck.core.command_registry import CommandRegistry
+from claude_streamdeck.core.asset_registry import AssetNotFoundError, AssetRegistry
+from claude_streamdeck.core.command_registry import CommandRegistry, InvalidParamsError
 from claude_streamdeck.core.core_api import CoreAPI
 from claude_streamdeck.core.device import DeviceModel, MockDevice
 from claude_streamdeck.core.device_manager import DeviceManager
 from claude_streamdeck.core.display_engine import DisplayEngine
 from claude_streamdeck.core.event_bus import EventBus
 from claude_streamdeck.core.input_dispatcher import InputDispatcher
+from claude_streamdeck.core.upload_sessions import UploadNotFoundError
 from claude_streamdeck.handlers import register_core_handlers
 
 
@@ -79,10 +81,72 @@ async def test_asset_upload_remove_list():
     assert up["animated"] is False
     listed = await api.commands.dispatch("asset.list", {})
     assert any(item["name"] == "a" for item in listed)
+    stats = await api.commands.dispatch("asset.cache_stats", {})
+    assert {"hits", "misses", "evictions", "bytes"} <= stats.keys()
     rm = await api.commands.dispatch("asset.remove", {"name": "a"})
     assert rm == {}
 
 
+async def test_asset_ensure_binds_known_digests():
+    api, _ = _api_with_mock_device()
+    await api.commands.dispatch("asset.upload", {"name": "a", "data": _png()})
+    known = hashlib.sha256(base64.b64decode(_png())).hexdigest()
+    out = await api.commands.dispatch("asset.ensure", {"assets": [
+        {"name": "b", "sha256": known},
+        {"name": "c", "sha256": "0" * 64},
+        {"name": "d", "sha256": "0" * 64},
+    ]})
+    assert out == {"bound": ["b"], "missing": ["0" * 64]}
+    assert api.assets.get("b").data is api.assets.get("a").data
+    with pytest.raises(InvalidParamsError):
+        await api.commands.dispatch("asset.ensure", {"assets": [
+            {"name": "x", "sha256": known},
+            {"name": "y", "sha256": "nope"},
+        ]})
+    with pytest.raises(AssetNotFoundError):
+        api.assets.get("x")  # nothing bound when any entry is invalid
+
+
+async def test_asset_upload_from_path(tmp_path):
+    api, _ = _api_with_mock_device()
+    f = tmp_path / "a.png"
+    f.write_bytes(base64.b64decode(_png()))
+    up = await api.commands.dispatch("asset.upload", {"name": "a", "path": str(f)})
+    assert up["name"] == "a"
+    assert api.assets.get("a").source == f.read_bytes()
+    with pytest.raises(ValueError):
+        await api.commands.dispatch(
+            "asset.upload", {"name": "a", "path": str(f), "data": _png()}
+        )
+    with pytest.raises(ValueError):
+        await api.commands.dispatch("asset.upload", {"name": "a", "shm": "../etc"})
+    with pytest.raises(InvalidParamsError):
+        await api.commands.dispatch("asset.upload", {"name": "a", "path": "a.png"})
+
+
+async def test_chunked_upload_commands():
+    api, _ = _api_with_mock_device()
+    raw = base64.b64decode(_png())
+    begin = await api.commands.dispatch(
+        "asset.upload_begin", {"name": "big", "size": str(len(raw))}
+    )
+    uid = begin["upload_id"]
+    for off in range(0, len(raw), 40):
+        chunk = base64.b64encode(raw[off:off + 40]).decode()
+        out = await api.commands.dispatch(
+            "asset.upload_chunk", {"upload_id": uid, "offset": off, "data": chunk}
+        )
+        assert out["received"] == min(off + 40, len(raw))
+    status = await api.commands.dispatch("asset.upload_status", {"upload_id": uid})
+    assert status["received"] == len(raw)
+    done = await api.commands.dispatch("asset.upload_commit", {"upload_id": uid})
+    assert done["name"] == "big"
+    assert api.assets.get("big").source == raw
+    with pytest.raises(UploadNotFoundError) as exc:
+        await api.commands.dispatch("asset.upload_status", {"upload_id": uid})
+    assert exc.value.error_code == "upload_not_found"
+
+
 async def test_display_set_clear():
     api, dev = _api_with_mock_device()
     await api.commands.dispatch("asset.upload", {"name": "a", "data": _png()})
@@ -92,12 +156,41 @@ async def test_display_set_clear():
     assert 5 in dev.cleared_keys
 
 
+async def test_display_set_many_reports_per_entry_status():
+    api, dev = _api_with_mock_device()
+    await api.commands.dispatch("asset.upload", {"name": "a", "data": _png()})
+    out = await api.commands.dispatch("display.set_many", {"entries": [
+        {"button": 0, "asset": "a"},
+        {"button": 1, "asset": "a"},
+        {"button": 2, "clear": True},
+        {"button": 3, "asset": "ghost"},
+        {"button": 99, "asset": "a"},
+        {"device_id": "nope", "button": 0, "asset": "a"},
+    ]})
+    codes = [r.get("error") for r in out["results"]]
+    assert codes == [None, None, None, "asset_not_found",
+                     "button_out_of_range", "device_not_found"]
+    assert dev.last_image_for(0) is not None
+    assert dev.last_image_for(1) is not None
+    assert dev.cleared_keys == [2]
+    assert dev.encode_count == 1  # one image prepared for both keys
+
+
 async def test_display_brightness():
     api, dev = _api_with_mock_device()
     await api.commands.dispatch("display.brightness", {"value": 42})
     assert dev.brightness == 42
 
 
+async def test_display_stats_lists_dropped_frames():
+    api, dev = _api_with_mock_device()
+    api.display._scheduler.dropped[(dev.id, 3)] = 7
+    out = await api.commands.dispatch("display.stats", {})
+    assert out == {"buttons": [
+        {"device_id": dev.id, "button": 3, "dropped_frames": 7, "skipped_writes": 0},
+    ]}
+
+
 async def test_input_set_active_then_press_emits():
     api, dev = _api_with_mock_device()
     received = []
@@ -0,0 +1,71 @@
+"""Tests for the per-device KeyWriter thread."""
+
+import threading
+from unittest.mock import MagicMock
+
+from PIL import Image
+
+from claude_streamdeck.core.device_xl import XLDevice
+from claude_streamdeck.core.key_writer import KeyWriter
+
+
+def test_writes_run_off_the_calling_thread():
+    w = KeyWriter(name="t")
+    seen = []
+    w.submit(0, lambda: seen.append(threading.current_thread().name))
+    assert w.flush(timeout=1.0)
+    w.close()
+    assert seen == ["t"]
+
+
+def test_latest_wins_while_a_write_is_in_flight():
+    w = KeyWriter(name="t")
+    gate = threading.Event()
+    started = threading.Event()
+    written = []
+
+    def slow():
+        started.set()
+        gate.wait(1.0)
+        written.append("first")
+
+    w.submit(1, slow)
+    assert started.wait(1.0)
+    for label in ("a", "b", "c"):
+        w.submit(1, lambda label=label: written.append(label))
+    gate.set()
+    assert w.flush(timeout=1.0)
+    w.close()
+    assert written == ["first", "c"]
+    assert w.coalesced == 2
+
+
+def test_close_drains_pending_writes():
+    w = KeyWriter(name="t")
+    written = []
+    for b in range(5):
+        w.submit(b, lambda b=b: written.append(b))
+    w.close()
+    assert written == [0, 1, 2, 3, 4]
+    w.submit(9, lambda: written.append(9))  # ignored after close
+    assert written == [0, 1, 2, 3, 4]
+
+
+def test_xl_device_writes_through_writer_thread():
+    hid = MagicMock()
+    hid.key_count.return_value = 32
+    hid.key_layout.return_value = (4, 8)
+    hid.key_image_format.return_value = {
+        "size": (96, 96), "format": "JPEG", "flip": (True, True), "rotation": 0,
+    }
+    threads = []
+    hid.set_key_image.side_effect = (
+        lambda *_: threads.append(threading.current_thread().name)
+    )
+    d = XLDevice(hid, id="xl-T")
+    d.set_key_image(3, Image.new("RGB", (96, 96), (9, 9, 9)))
+    d._writer.flush(timeout=1.0)
+    assert threads == ["hid-writer-xl-T"]
+    d.close()
+    assert hid.set_key_image.call_count == 1 + 32  # image + clear-all on close
+    hid.close.assert_called_once()
@@ -38,6 +38,7 @@ async def test_e2e_set_image_then_press():
     cfg = DaemonConfig(
         socket_path=sock,
         assets_dir=Path("/nonexistent"),
+        cache_dir=sock.parent / "cache",
         extensions=[],
     )
     daemon = Daemon(cfg)
@@ -88,7 +89,8 @@ async def test_e2e_set_image_then_press():
 
 async def test_e2e_unknown_command_keeps_connection():
     sock = Path(tempfile.mkdtemp()) / "e2e2.sock"
-    cfg = DaemonConfig(socket_path=sock, assets_dir=Path("/nonexistent"), extensions=[])
+    cfg = DaemonConfig(socket_path=sock, assets_dir=Path("/nonexistent"),
+                       cache_dir=sock.parent / "cache", extensions=[])
     daemon = Daemon(cfg)
     mock = MockDevice(id="m", model=DeviceModel.XL, key_count=32, image_size=(96, 96))
     with patch.object(daemon.devices, "enumerate", return_value=[mock]):
@@ -100,6 +102,16 @@ async def test_e2e_unknown_command_keeps_connection():
         assert resp["ok"] is False
         assert resp["error"] == "unknown_command"
 
+        # A single command and a batch entry report the same error code.
+        await _send(w, {"cmd": "display.set", "request_id": "g1",
+                        "button": 0, "asset": "ghost"})
+        resp = await _recv(r)
+        assert resp["error"] == "asset_not_found"
+        await _send(w, {"cmd": "display.set_many", "request_id": "g2",
+                        "entries": [{"button": 0, "asset": "ghost"}]})
+        resp = await _recv(r)
+        assert resp["result"]["results"][0]["error"] == "asset_not_found"
+
         await _send(w, {"cmd": "system.ping", "request_id": "y"})
         resp = await _recv(r)
         assert resp["ok"] is True
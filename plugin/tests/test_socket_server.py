@@ -70,6 +70,27 @@ async def test_unknown_command_returns_error():
         await server.stop()
 
 
+async def test_handler_error_code_is_reported():
+    reg = CommandRegistry()
+
+    class Busy(Exception):
+        error_code = "busy"
+
+    async def busy(p): raise Busy("try later")
+    reg.register("x.busy", busy)
+    bus = EventBus()
+    server, sock = await _start_server(reg, bus)
+    try:
+        r, w = await _client(sock)
+        await _send(w, {"cmd": "x.busy", "request_id": "1"})
+        assert await _recv(r) == {"ok": False, "request_id": "1", "error": "busy",
+                                  "message": "try later"}
+        w.close()
+        await w.wait_closed()
+    finally:
+        await server.stop()
+
+
 async def test_invalid_json_returns_error_keeps_connection():
     reg = CommandRegistry()
     async def ping(p): return {}
@@ -123,3 +144,96 @@ async def test_event_broadcast_to_subscribed_only():
             w.close(); await w.wait_closed()
     finally:
         await server.stop()
+
+
+async def test_oversized_line_gets_error_and_connection_survives():
+    reg = CommandRegistry()
+    async def ping(p): return {"pong": True}
+    reg.register("system.ping", ping)
+    bus = EventBus()
+    sock_path = Path(tempfile.mkdtemp()) / "big.sock"
+    server = SocketServer(socket_path=sock_path, commands=reg, events=bus,
+                          max_line_bytes=100_000)
+    await server.start()
+    try:
+        r, w = await _client(sock_path)
+        await _send(w, {"cmd": "system.ping", "data": "A" * 80_000, "request_id": "1"})
+        assert (await _recv(r))["result"] == {"pong": True}
+        await _send(w, {"cmd": "system.ping", "data": "A" * 200_000})
+        err = await _recv(r)
+        assert err["ok"] is False and err["error"] == "line_too_long"
+        await _send(w, {"cmd": "system.ping", "request_id": "2"})
+        assert (await _recv(r))["request_id"] == "2"
+        w.close()
+        await w.wait_closed()
+    finally:
+        await server.stop()
+
+
+async def test_slow_subscriber_does_not_hold_up_others():
+    reg = CommandRegistry()
+    bus = EventBus()
+    sock_path = Path(tempfile.mkdtemp()) / "slow.sock"
+    server = SocketServer(socket_path=sock_path, commands=reg, events=bus,
+                          outbound_queue=4)
+    await server.start()
+    try:
+        bus.bind_loop(asyncio.get_running_loop())
+        fast_r, fast_w = await asyncio.open_unix_connection(str(sock_path), limit=1 << 20)
+        slow_r, slow_w = await _client(sock_path)  # subscribes, then never reads
+        for r, w in ((fast_r, fast_w), (slow_r, slow_w)):
+            await _send(w, {"cmd": "input.subscribe", "request_id": "s"})
+            assert (await _recv(r))["ok"] is True
+
+        async def read_all():
+            seen = 0
+            while True:
+                obj = json.loads(await fast_r.readline())
+                if "event" in obj:
+                    seen += 1
+                elif obj.get("request_id") == "stats":
+                    return seen, obj["result"]
+
+        reader = asyncio.create_task(read_all())
+        pad = "A" * 100_000  # a few of these fill the slow client's socket buffer
+        for i in range(50):
+            await asyncio.wait_for(
+                bus.publish("button.pressed", {"device_id": "x", "button": i, "pad": pad}), 1.0
+            )
+        await _send(fast_w, {"cmd": "system.connections", "request_id": "stats"})
+        seen, result = await asyncio.wait_for(reader, 5.0)
+        assert seen == 50
+        stats = {c["id"]: c for c in result["connections"]}
+        assert stats[result["self"]]["dropped"] == 0
+        (slow,) = [c for i, c in stats.items() if i != result["self"]]
+        assert slow["dropped"] > 0 and slow["queued"] <= 4
+        for w in (fast_w, slow_w):
+            w.close()
+    finally:
+        await server.stop()
+
+
+async def test_broadcast_encodes_each_event_once(monkeypatch):
+    from claude_streamdeck.transport import socket_server
+
+    calls = []
+    real = socket_server.encode_event
+    monkeypatch.setattr(socket_server, "encode_event",
+                        lambda *a: calls.append(a) or real(*a))
+    reg = CommandRegistry()
+    bus = EventBus()
+    server, sock = await _start_server(reg, bus)
+    try:
+        bus.bind_loop(asyncio.get_running_loop())
+        clients = [await _client(sock) for _ in range(3)]
+        for r, w in clients:
+            await _send(w, {"cmd": "input.subscribe", "request_id": "s"})
+            assert (await _recv(r))["ok"] is True
+        await bus.publish("button.pressed", {"device_id": "x", "button": 2})
+        lines = [await asyncio.wait_for(r.readline(), 1.0) for r, _ in clients]
+        assert len(calls) == 1
+        assert lines[0] == lines[1] == lines[2]  # same bytes, same ts
+        for _, w in clients:
+            w.close()
+    finally:
+        await server.stop()
@@ -0,0 +1,61 @@
+"""Tests for the static assets dir watcher."""
+
+import asyncio
+import struct
+import sys
+
+import pytest
+
+from claude_streamdeck.core.static_watcher import StaticWatcher
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+async def test_reports_added_changed_and_removed_files(tmp_path, use_inotify):
+    if use_inotify and not sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux-only")
+    (tmp_path / "old.png").write_bytes(b"1")
+    batches = []
+
+    async def on_change(paths):
+        batches.append(paths)
+
+    w = StaticWatcher(tmp_path, on_change, poll_interval=0.02, debounce=0.05,
+                      use_inotify=use_inotify)
+    w.start()
+    assert w.mode == ("inotify" if use_inotify else "poll")
+    await asyncio.sleep(0.05)
+    (tmp_path / "new.png").write_bytes(b"2")
+    (tmp_path / "old.png").unlink()
+    for _ in range(50):
+        await asyncio.sleep(0.02)
+        if batches and {p.name for b in batches for p in b} >= {"new.png", "old.png"}:
+            break
+    w.close()
+    assert {p.name for b in batches for p in b} == {"new.png", "old.png"}
+    assert len(batches) == 1  # debounced into one reload
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"),
+                    reason="inotify is Linux-only")
+async def test_inotify_overflow_rescans_directory(tmp_path, monkeypatch):
+    from claude_streamdeck.core import static_watcher
+
+    (tmp_path / "kept.png").write_bytes(b"1")
+    (tmp_path / "gone.png").write_bytes(b"2")
+    batches = []
+
+    async def on_change(paths):
+        batches.append(paths)
+
+    w = StaticWatcher(tmp_path, on_change, debounce=0.01)
+    w.start()
+    assert w.mode == "inotify"
+    (tmp_path / "gone.png").unlink()
+    (tmp_path / "added.png").write_bytes(b"3")
+    # Stand in for a queue that overflowed before those events were read.
+    overflow = struct.pack("iIII", -1, static_watcher._IN_Q_OVERFLOW, 0, 0)
+    monkeypatch.setattr(static_watcher.os, "read", lambda fd, n: overflow)
+    w._read_events()
+    await asyncio.sleep(0.05)
+    w.close()
+    assert {p.name for b in batches for p in b} == {"gone.png", "added.png"}
@@ -0,0 +1,83 @@
+"""Tests for chunked UploadSessions."""
+
+import base64
+import hashlib
+
+import pytest
+
+from claude_streamdeck.core.asset_registry import (
+    AssetTooLargeError,
+    InvalidAssetDataError,
+)
+from claude_streamdeck.core.command_registry import InvalidParamsError
+from claude_streamdeck.core.upload_sessions import (
+    UploadLimitError,
+    UploadNotFoundError,
+    UploadSessions,
+)
+
+
+def _b64(b: bytes) -> str:
+    return base64.b64encode(b).decode()
+
+
+def test_chunks_assemble_and_verify_digest():
+    s = UploadSessions(max_size_bytes=100)
+    raw = bytes(range(30))
+    uid = s.begin("a", size=30, sha256=hashlib.sha256(raw).hexdigest())
+    assert s.append(uid, 0, _b64(raw[:10])) == 10
+    assert s.append(uid, 10, _b64(raw[10:])) == 30
+    assert s.finish(uid) == ("a", raw)
+    with pytest.raises(UploadNotFoundError):
+        s.status(uid)
+
+
+def test_resume_from_last_acknowledged_offset():
+    s = UploadSessions(max_size_bytes=100)
+    uid = s.begin("a")
+    s.append(uid, 0, _b64(b"aaaa"))
+    s.append(uid, 4, _b64(b"bbbb"))
+    # The ack for the second chunk was lost; the client resends it.
+    assert s.append(uid, 4, _b64(b"bbbb")) == 8
+    assert s.status(uid)["received"] == 8
+    with pytest.raises(InvalidParamsError):
+        s.append(uid, 12, _b64(b"cc"))  # gap
+    assert s.finish(uid)[1] == b"aaaabbbb"
+
+
+def test_limits_and_mismatches():
+    s = UploadSessions(max_size_bytes=8)
+    with pytest.raises(AssetTooLargeError):
+        s.begin("a", size=9)
+    uid = s.begin("a")
+    with pytest.raises(AssetTooLargeError):
+        s.append(uid, 0, _b64(b"x" * 9))
+    uid = s.begin("a", sha256="0" * 64)
+    s.append(uid, 0, _b64(b"x"))
+    with pytest.raises(InvalidAssetDataError):
+        s.finish(uid)
+
+
+def test_idle_sessions_expire():
+    s = UploadSessions(max_size_bytes=8, ttl_s=0.0)
+    uid = s.begin("a")
+    with pytest.raises(UploadNotFoundError):
+        s.append(uid, 0, _b64(b"x"))
+
+
+def test_session_count_and_buffered_bytes_are_bounded():
+    s = UploadSessions(max_size_bytes=8, max_sessions=2, max_total_bytes=12)
+    a, b = s.begin("a"), s.begin("b")
+    with pytest.raises(UploadLimitError):
+        s.begin("c")
+    s.append(a, 0, _b64(b"x" * 8))
+    with pytest.raises(UploadLimitError):
+        s.append(b, 0, _b64(b"y" * 5))
+    assert s.append(b, 0, _b64(b"y" * 4)) == 4
+    s.append(a, 4, _b64(b"z"))  # rewriting a tail frees what it replaces
+    s.abort(a)
+    assert s.append(b, 4, _b64(b"y" * 4)) == 8
+    with pytest.raises(UploadLimitError):
+        s.begin("c", size=5)
+    assert s.finish(b) == ("b", b"y" * 8)
+    s.begin("c", size=8)